@@ -6,7 +6,7 @@ from flask_login import LoginManager
 from flask_mail import Mail
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import text
-from extensions import db  # Import db from extensions.py
+from extensions import db, socketio  # Import db and socketio from extensions.py
 from flask_migrate import Migrate
 
 # Configure logging
@@ -33,16 +33,39 @@ if database_url.startswith("postgres://"):
 # Set the database URI in the app configuration
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 
-# Initialize the database with the app
-db.init_app(app)
-
-# Initialize Flask-Migrate
-migrate = Migrate(app, db)
-
+# Pool sizing: with gevent workers many requests share one process, but most of them are
+# waiting on the LLM rather than holding a connection. Every worker has its own pool, so the
+# per-dyno share of the Postgres connection limit (DB_MAX_CONNECTIONS) is split between them,
+# keeping a few connections for CLI jobs and release commands
+web_workers = int(os.environ.get('WEB_WORKERS', 1)) if os.environ.get('SOCKETIO_STICKY_SESSIONS') == '1' else 1
+db_connections_per_worker = max(2, (int(os.environ.get('DB_MAX_CONNECTIONS', 20)) - 3) // web_workers)
+pool_size = int(os.environ.get("DB_POOL_SIZE", db_connections_per_worker // 2))
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
+    "pool_size": pool_size,
+    "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", max(0, db_connections_per_worker - pool_size))),
+    "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+}
+
+# Read replicas: each URL in DATABASE_REPLICA_URLS becomes a bind used by read-only views
+replica_urls = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+app.config['SQLALCHEMY_BINDS'] = {
+    f'replica_{i}': url.replace("postgres://", "postgresql://", 1) for i, url in enumerate(replica_urls)
 }
+app.config['REPLICA_BINDS'] = list(app.config['SQLALCHEMY_BINDS'])
+app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+app.config['REPLICA_LAG_CHECK_INTERVAL'] = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 2))
+app.config['READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+
+# Initialize the database with the app (engine options must be set before this)
+db.init_app(app)
+
+from db_routing import replica_router
+replica_router.init_app(app)
+
+# Initialize Flask-Migrate
+migrate = Migrate(app, db)
 
 # Email configuration
 app.config['MAIL_SERVER'] = 'smtp.gmail.com'
@@ -54,6 +77,8 @@ app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 # SendGrid configuration
 app.config['SENDGRID_API_KEY'] = os.environ.get('SENDGRID_API_KEY')
 app.config['SENDGRID_FROM_EMAIL'] = os.environ.get('SENDGRID_FROM_EMAIL')
+# Verification key from SendGrid Mail Settings > Signed Event Webhook
+app.config['SENDGRID_WEBHOOK_PUBLIC_KEY'] = os.environ.get('SENDGRID_WEBHOOK_PUBLIC_KEY')
 
 # OpenAI configuration
 openai_api_key = os.environ.get("OPEN_AI_KEY")
@@ -62,6 +87,12 @@ if not openai_api_key:
 else:
     logger.info(f"OpenAI API key is set: {openai_api_key[:5]}...")
 
+# Chat memory configuration: recent turns are kept verbatim, older ones are summarized
+app.config['CHAT_MEMORY_MAX_TURNS'] = int(os.environ.get('CHAT_MEMORY_MAX_TURNS', 6))
+app.config['CHAT_MEMORY_TOKEN_BUDGET'] = int(os.environ.get('CHAT_MEMORY_TOKEN_BUDGET', 1500))
+app.config['CHAT_MEMORY_SUMMARY_TOKEN_BUDGET'] = int(os.environ.get('CHAT_MEMORY_SUMMARY_TOKEN_BUDGET', 300))
+app.config['CHAT_MAX_MESSAGE_CHARS'] = int(os.environ.get('CHAT_MAX_MESSAGE_CHARS', 4000))
+
 # Initialize extensions
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -83,6 +114,84 @@ app.register_blueprint(main_blueprint)
 from google_auth import google_auth_bp  # Import the google_auth blueprint
 app.register_blueprint(google_auth_bp, url_prefix='/google_login')
 
+from email_events import email_events_bp  # SendGrid event webhook
+app.register_blueprint(email_events_bp)
+
+# Fragment cache for dashboard and feedback session lists, invalidated on commit
+app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 1024))
+app.config['FRAGMENT_CACHE_REDIS_URL'] = os.environ.get('FRAGMENT_CACHE_REDIS_URL')
+# Without redis each process has its own invalidation counters, so commits from other
+# workers and CLI jobs only show up once local fragments expire
+if os.environ.get('FRAGMENT_CACHE_LOCAL_TTL'):
+    app.config['FRAGMENT_CACHE_LOCAL_TTL'] = float(os.environ['FRAGMENT_CACHE_LOCAL_TTL'])
+# Several workers on one dyno would each serve their own stale copies, so cache only with redis then
+app.config['FRAGMENT_CACHE_ENABLED'] = web_workers == 1 or bool(app.config['FRAGMENT_CACHE_REDIS_URL'])
+from fragment_cache import fragment_cache
+fragment_cache.init_app(app)
+
+# Real-time provider status push; a message queue lets other processes (and workers) publish
+socketio.init_app(app, message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE'))
+import realtime  # Registers Socket.IO handlers and commit hooks
+
+# Completed sessions older than this move to compressed cold storage (flask archive run)
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+from archival import archive_cli
+app.cli.add_command(archive_cli)
+
+# Feedback history export (/export and flask export user), streamed in cursor batches
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+from data_export import export_cli
+app.cli.add_command(export_cli)
+
+# Online data backfills (flask backfill run <name>), checkpointed so they resume
+from backfill import backfill_cli
+app.cli.add_command(backfill_cli)
+
+# Idempotency-Key support: stored responses are replayed to retries until they expire
+app.config['IDEMPOTENCY_TTL_SECONDS'] = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+app.config['IDEMPOTENCY_WAIT_SECONDS'] = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 10))
+app.config['IDEMPOTENCY_LOCK_TIMEOUT_SECONDS'] = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT_SECONDS', 300))
+from idempotency import idempotency_cli
+app.cli.add_command(idempotency_cli)
+
+# Bulk re-analysis of historical sessions (flask reanalyze --tag <version>)
+from reanalysis import reanalyze_command
+app.cli.add_command(reanalyze_command)
+
+# Admin-only request profiling: X-Profile header or a sampled fraction of signed-in users' requests,
+# browsed at /_profiles/
+app.config['PROFILER_SAMPLE_RATE'] = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+app.config['PROFILER_TOKEN'] = os.environ.get('PROFILER_TOKEN')
+app.config['PROFILER_ADMIN_EMAILS'] = [
+    email.strip().lower() for email in os.environ.get('PROFILER_ADMIN_EMAILS', '').split(',') if email.strip()
+]
+app.config['PROFILER_DIR'] = os.environ.get('PROFILER_DIR')
+from request_profiler import init_profiler
+init_profiler(app)
+
+# Sliding-window rate limits on public feedback pages and token checks, applied before DB access
+app.config['RATE_LIMITS'] = {
+    'feedback_session': os.environ.get('RATE_LIMIT_FEEDBACK_SESSION', '60/minute'),
+    'feedback_token_ip': os.environ.get('RATE_LIMIT_FEEDBACK_TOKEN_IP', '20/minute'),
+    'feedback_token_prefix': os.environ.get('RATE_LIMIT_FEEDBACK_TOKEN_PREFIX', '10/minute'),
+    'chat_message': os.environ.get('RATE_LIMIT_CHAT_MESSAGE', '20/minute'),
+}
+app.config['RATE_LIMIT_REDIS_URL'] = os.environ.get('RATE_LIMIT_REDIS_URL')
+app.config['RATE_LIMIT_EXEMPT_IPS'] = [
+    ip.strip() for ip in os.environ.get('RATE_LIMIT_EXEMPT_IPS', '').split(',') if ip.strip()
+]
+app.config['RATE_LIMIT_EXEMPT_TOKEN_PREFIXES'] = [
+    prefix.strip() for prefix in os.environ.get('RATE_LIMIT_EXEMPT_TOKEN_PREFIXES', '').split(',') if prefix.strip()
+]
+# Heroku's router appends the client address to X-Forwarded-For; set 0 only when serving directly
+app.config['RATE_LIMIT_PROXY_HOPS'] = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 1))
+from rate_limiting import rate_limiter
+rate_limiter.init_app(app)
+
+# Serve fingerprinted, precompressed static assets with immutable caching
+from asset_pipeline import init_assets
+init_assets(app)
+
 def migrate_database():
     with current_app.app_context():
         # Check if columns exist
@@ -101,4 +210,4 @@ def migrate_database():
             logger.info("Successfully added missing columns")
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    socketio.run(app, debug=True)
@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, null
+
+from extensions import db
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+archive_cli = AppGroup("archive", help="Move old feedback session content to cold storage.")
+
+
+def compress_content(content: Any) -> Tuple[str, bytes, int]:
+    """Serialize and compress session content, returning (codec, payload, original size)"""
+    raw = json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(raw), len(raw)
+    return "zlib", zlib.compress(raw, 9), len(raw)
+
+
+def decompress_content(codec: str, payload: bytes) -> Any:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archived content is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == "zlib":
+        raw = zlib.decompress(payload)
+    else:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    return json.loads(raw.decode("utf-8"))
+
+
+def archive_sessions(older_than_days: int = 180, batch_size: int = 500, max_batches: Optional[int] = None,
+                     pause: float = 0.0) -> Dict[str, int]:
+    """Move content of completed sessions older than the policy window into the archive table.
+
+    Each batch is its own short transaction and skips rows locked by live traffic, so the job
+    runs online. Progress is the data itself (archived_at), so an interrupted run simply
+    resumes on the next invocation.
+    """
+    from models import FeedbackSession, FeedbackSessionArchive
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    totals = {"batches": 0, "sessions": 0, "bytes_in": 0, "bytes_out": 0}
+    last_id = 0
+
+    while max_batches is None or totals["batches"] < max_batches:
+        query = (
+            FeedbackSession.query
+            .filter(FeedbackSession.id > last_id)
+            .filter(FeedbackSession.archived_at.is_(None))
+            .filter(FeedbackSession.completed_at.isnot(None))
+            .filter(FeedbackSession.completed_at < cutoff)
+            .order_by(FeedbackSession.id)
+            .limit(batch_size)
+        )
+        if db.engine.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        batch = query.all()
+        if not batch:
+            break
+
+        now = datetime.utcnow()
+        for session in batch:
+            if session._content is None:
+                session.archived_at = now
+                continue
+            codec, payload, original_size = compress_content(session._content)
+            db.session.add(FeedbackSessionArchive(
+                session_id=session.id,
+                codec=codec,
+                payload=payload,
+                original_size=original_size,
+                archived_at=now,
+            ))
+            # SQL NULL rather than JSON null, so the hot row really shrinks
+            session._content = null()
+            session.archived_at = now
+            totals["bytes_in"] += original_size
+            totals["bytes_out"] += len(payload)
+
+        db.session.commit()
+        last_id = batch[-1].id
+        totals["batches"] += 1
+        totals["sessions"] += len(batch)
+        logger.info(f"Archived batch {totals['batches']}: {len(batch)} sessions up to id {last_id}")
+        if pause:
+            time.sleep(pause)
+
+    return totals
+
+
+@archive_cli.command("run")
+@click.option("--older-than-days", type=int, default=None, help="Archive sessions completed before this many days ago.")
+@click.option("--batch-size", type=int, default=500, show_default=True)
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+@click.option("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+def run_command(older_than_days, batch_size, max_batches, pause):
+    """Archive completed feedback sessions older than the policy window."""
+    days = older_than_days or current_app.config.get("ARCHIVE_AFTER_DAYS", 180)
+    started = time.monotonic()
+    totals = archive_sessions(days, batch_size, max_batches, pause)
+    ratio = totals["bytes_out"] / totals["bytes_in"] if totals["bytes_in"] else 0
+    click.echo(
+        f"Archived {totals['sessions']} sessions in {totals['batches']} batches "
+        f"({totals['bytes_in']} -> {totals['bytes_out']} bytes, ratio {ratio:.2f}) "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+
+
+@archive_cli.command("status")
+def status_command():
+    """Show how many sessions are hot, archived and eligible for archival."""
+    from models import FeedbackSession, FeedbackSessionArchive
+
+    days = current_app.config.get("ARCHIVE_AFTER_DAYS", 180)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = FeedbackSession.query.filter(FeedbackSession.archived_at.isnot(None)).count()
+    eligible = FeedbackSession.query.filter(
+        FeedbackSession.archived_at.is_(None),
+        FeedbackSession.completed_at.isnot(None),
+        FeedbackSession.completed_at < cutoff,
+    ).count()
+    sizes = db.session.query(
+        func.coalesce(func.sum(FeedbackSessionArchive.original_size), 0),
+        func.coalesce(func.sum(func.length(FeedbackSessionArchive.payload)), 0),
+    ).one()
+    click.echo(f"Archived sessions: {archived} ({sizes[0]} bytes stored as {sizes[1]})")
+    click.echo(f"Eligible for archival (older than {days} days): {eligible}")
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+from typing import Dict
+
+import click
+from flask import Blueprint, Flask, abort, current_app, request, send_file, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip variants are always built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+BUILD_DIRNAME = "build"
+MANIFEST_NAME = "manifest.json"
+FINGERPRINTED_EXTENSIONS = (".js", ".css")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+assets_bp = Blueprint("assets", __name__)
+assets_cli = AppGroup("assets", help="Build fingerprinted static assets.")
+
+
+def _fingerprint(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def _source_files(static_folder: str, output_folder: str):
+    """Yield (relative path, absolute path) for every asset that gets fingerprinted"""
+    output_folder = os.path.abspath(output_folder)
+    for root, dirs, files in os.walk(static_folder):
+        # Never fingerprint our own output
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_folder]
+        for name in sorted(files):
+            if name.endswith(FINGERPRINTED_EXTENSIONS):
+                source_path = os.path.join(root, name)
+                yield os.path.relpath(source_path, static_folder).replace(os.sep, "/"), source_path
+
+
+def build_assets(static_folder: str, output_folder: str = None) -> Dict[str, str]:
+    """Write fingerprinted, precompressed copies of static assets and return the manifest.
+
+    The manifest maps each source path (as passed to url_for('static', ...)) to its
+    fingerprinted path inside the build folder.
+    """
+    output_folder = output_folder or os.path.join(static_folder, BUILD_DIRNAME)
+    manifest = {}
+
+    for relative, source_path in _source_files(static_folder, output_folder):
+        with open(source_path, "rb") as f:
+            content = f.read()
+
+        base, ext = os.path.splitext(relative)
+        fingerprinted = f"{base}.{_fingerprint(content)}{ext}"
+        target = os.path.join(output_folder, fingerprinted)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with open(target, "wb") as f:
+            f.write(content)
+        # mtime=0 keeps the gzip output byte-identical across builds
+        with open(target + ".gz", "wb") as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target + ".br", "wb") as f:
+                f.write(brotli.compress(content, quality=11))
+
+        manifest[relative] = fingerprinted
+
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info(f"Built {len(manifest)} fingerprinted assets in {output_folder}")
+    return manifest
+
+
+def load_manifest(output_folder: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(output_folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def manifest_is_current(static_folder: str, output_folder: str, manifest: Dict[str, str]) -> bool:
+    """Check that the manifest covers every source asset at its current content hash"""
+    current = {}
+    for relative, source_path in _source_files(static_folder, output_folder):
+        with open(source_path, "rb") as f:
+            base, ext = os.path.splitext(relative)
+            current[relative] = f"{base}.{_fingerprint(f.read())}{ext}"
+    return current == manifest and all(
+        os.path.exists(os.path.join(output_folder, path)) for path in manifest.values()
+    )
+
+
+def asset_url_for(endpoint: str, **values) -> str:
+    """url_for override that points static assets at their fingerprinted build"""
+    if endpoint == "static":
+        fingerprinted = current_app.extensions["asset_manifest"].get(values.get("filename"))
+        if fingerprinted:
+            values["filename"] = fingerprinted
+            endpoint = "assets.serve_asset"
+    return url_for(endpoint, **values)
+
+
+def _pick_encoding(path: str):
+    """Return (path, content-encoding) for the best precompressed variant the client accepts"""
+    accepted = request.accept_encodings
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepted[encoding] and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+@assets_bp.route("/assets/<path:filename>")
+def serve_asset(filename):
+    if filename not in current_app.extensions["asset_files"]:
+        abort(404)
+
+    path, encoding = _pick_encoding(os.path.join(current_app.config["ASSET_BUILD_FOLDER"], filename))
+    # The filename already carries the content hash; each encoding is its own representation
+    etag = filename.rsplit(".", 2)[-2] + (f"-{encoding}" if encoding else "")
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_file(path, mimetype=mimetype, conditional=False, etag=False, max_age=None)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+@assets_cli.command("build")
+def build_command():
+    """Build fingerprinted and precompressed static assets."""
+    manifest = build_assets(current_app.static_folder, current_app.config["ASSET_BUILD_FOLDER"])
+    current_app.extensions["asset_manifest"] = manifest
+    current_app.extensions["asset_files"] = set(manifest.values())
+    click.echo(f"Built {len(manifest)} assets")
+
+
+def init_assets(app: Flask) -> None:
+    """Serve fingerprinted assets and route url_for('static', ...) to them.
+
+    Assets are normally built at deploy time (bin/post_compile); if the manifest is
+    missing or stale they are rebuilt once at startup.
+    """
+    app.config.setdefault("ASSET_BUILD_FOLDER", os.path.join(app.static_folder, BUILD_DIRNAME))
+    build_folder = app.config["ASSET_BUILD_FOLDER"]
+
+    manifest = load_manifest(build_folder)
+    if app.config.get("ASSETS_BUILD_ON_STARTUP", True) and not manifest_is_current(
+            app.static_folder, build_folder, manifest):
+        manifest = build_assets(app.static_folder, build_folder)
+
+    app.extensions["asset_manifest"] = manifest
+    app.extensions["asset_files"] = set(manifest.values())
+    app.register_blueprint(assets_bp)
+    app.cli.add_command(assets_cli)
+    app.jinja_env.globals["url_for"] = asset_url_for
+
+
+if __name__ == "__main__":
+    # Standalone build, usable at deploy time without importing (and configuring) the app
+    static_root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "static")
+    logging.basicConfig(level=logging.INFO)
+    build_assets(static_root)
@@ -33,6 +33,11 @@ def create_feedback_token(provider_id):
 
 def verify_feedback_token(token):
     """Verify a feedback provider's access token"""
+    # Throttle token guessing per client and token prefix before it reaches the database
+    limiter = current_app.extensions.get("rate_limiter")
+    if token and limiter is not None:
+        limiter.check_token(token)
+
     try:
         if not token:
             return None
@@ -0,0 +1,218 @@
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from extensions import db
+from models import BackfillCheckpoint, FeedbackRequest
+
+logger = logging.getLogger(__name__)
+
+backfill_cli = AppGroup("backfill", help="Run online, resumable data backfills.")
+
+
+@dataclass
+class Progress:
+    """Throughput and ETA for a long-running job"""
+
+    total: Optional[int] = None
+    done: int = 0
+    clock: Callable[[], float] = time.monotonic
+    started: float = field(default=None)
+
+    def __post_init__(self):
+        if self.started is None:
+            self.started = self.clock()
+
+    def advance(self, amount: int = 1) -> None:
+        self.done += amount
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if self.total is None or not self.rate:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def format(self) -> str:
+        parts = [f"{self.done}" + (f"/{self.total}" if self.total is not None else "")]
+        if self.total:
+            parts.append(f"({100.0 * self.done / self.total:.1f}%)")
+        parts.append(f"{self.rate:.1f}/s")
+        if self.eta is not None:
+            parts.append(f"ETA {self.eta:.0f}s")
+        return " ".join(parts)
+
+
+def load_checkpoint(name: str, restart: bool = False) -> BackfillCheckpoint:
+    """Fetch or create the named checkpoint, resetting it when restart is set"""
+    checkpoint = db.session.get(BackfillCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = BackfillCheckpoint(name=name, last_id=0, rows_scanned=0, rows_updated=0, status='running')
+        db.session.add(checkpoint)
+    elif restart:
+        checkpoint.last_id = 0
+        checkpoint.max_id = None
+        checkpoint.rows_scanned = 0
+        checkpoint.rows_updated = 0
+        checkpoint.status = 'running'
+        checkpoint.started_at = datetime.utcnow()
+        checkpoint.completed_at = None
+    db.session.commit()
+    return checkpoint
+
+
+class Backfill(ABC):
+    """A data migration applied in primary-key ranges.
+
+    Subclasses name the model, a filter selecting rows that still need the change, and
+    apply() to change a batch. The filter is what makes reruns idempotent: rows already
+    migrated (by an earlier run or by new application code) are never selected again.
+    """
+
+    name: str = None
+    description: str = ""
+    model = None
+
+    @abstractmethod
+    def pending(self):
+        """Filter expression selecting the rows that still need this backfill"""
+
+    @abstractmethod
+    def apply(self, rows: List) -> int:
+        """Change the rows in place and return how many were updated"""
+
+
+BACKFILLS: Dict[str, Backfill] = {}
+
+
+def register_backfill(cls):
+    BACKFILLS[cls.name] = cls()
+    return cls
+
+
+def run_backfill(backfill: Backfill, batch_size: int = 1000, pause: float = 0.0,
+                 max_batches: Optional[int] = None, restart: bool = False,
+                 on_progress: Optional[Callable[[BackfillCheckpoint, Progress], None]] = None) -> BackfillCheckpoint:
+    """Run a backfill from its checkpoint until the snapshotted max id is reached.
+
+    Each id range is updated and checkpointed in the same short transaction, so an
+    interrupted run neither loses nor repeats work. Rows inserted after the run started
+    are written by current code and don't need the backfill.
+    """
+    checkpoint = load_checkpoint(backfill.name, restart)
+    if checkpoint.status == 'completed':
+        return checkpoint
+
+    pk = backfill.model.id
+    if checkpoint.max_id is None:
+        checkpoint.max_id = db.session.query(func.max(pk)).scalar() or 0
+        db.session.commit()
+
+    progress = Progress(total=checkpoint.max_id - checkpoint.last_id)
+    batches = 0
+    while checkpoint.last_id < checkpoint.max_id and (max_batches is None or batches < max_batches):
+        low = checkpoint.last_id
+        high = min(low + batch_size, checkpoint.max_id)
+        query = (
+            backfill.model.query
+            .filter(pk > low, pk <= high, backfill.pending())
+            .order_by(pk)
+        )
+        if db.engine.dialect.name == "postgresql":
+            # Wait for row locks held by live requests rather than skipping rows we'd never revisit
+            query = query.with_for_update()
+        rows = query.all()
+        updated = backfill.apply(rows) if rows else 0
+
+        checkpoint.last_id = high
+        checkpoint.rows_scanned += len(rows)
+        checkpoint.rows_updated += updated
+        checkpoint.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        batches += 1
+        progress.advance(high - low)
+        logger.info(f"Backfill {backfill.name}: ids up to {high}, {progress.format()}")
+        if on_progress:
+            on_progress(checkpoint, progress)
+        if pause:
+            time.sleep(pause)
+
+    if checkpoint.last_id >= checkpoint.max_id:
+        checkpoint.status = 'completed'
+        checkpoint.completed_at = datetime.utcnow()
+        db.session.commit()
+    return checkpoint
+
+
+@register_backfill
+class FeedbackRequestIdBackfill(Backfill):
+    name = "feedback_request_request_id"
+    description = "Assign a UUID request_id to feedback requests created before the column existed."
+    model = FeedbackRequest
+
+    def pending(self):
+        return FeedbackRequest.request_id.is_(None)
+
+    def apply(self, rows):
+        for feedback_request in rows:
+            feedback_request.request_id = str(uuid.uuid4())
+        return len(rows)
+
+
+@backfill_cli.command("list")
+def list_command():
+    """List registered backfills and their checkpoint status."""
+    for name, backfill in sorted(BACKFILLS.items()):
+        checkpoint = db.session.get(BackfillCheckpoint, name)
+        status = checkpoint.status if checkpoint else "not started"
+        click.echo(f"{name} [{status}] {backfill.description}")
+
+
+@backfill_cli.command("run")
+@click.argument("name")
+@click.option("--batch-size", type=int, default=1000, show_default=True, help="Primary-key range per batch.")
+@click.option("--pause", type=float, default=0.1, show_default=True, help="Seconds to sleep between batches.")
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and start from the first id.")
+def run_command(name, batch_size, pause, max_batches, restart):
+    """Run the NAME backfill, resuming from its checkpoint."""
+    backfill = BACKFILLS.get(name)
+    if backfill is None:
+        raise click.ClickException(f"Unknown backfill {name}; choose from {', '.join(sorted(BACKFILLS))}")
+
+    def report(checkpoint, progress):
+        click.echo(f"ids <= {checkpoint.last_id}: {progress.format()}, "
+                   f"{checkpoint.rows_updated} rows updated")
+
+    checkpoint = run_backfill(backfill, batch_size, pause, max_batches, restart, on_progress=report)
+    click.echo(f"{name}: {checkpoint.status}, {checkpoint.rows_updated} rows updated "
+               f"of {checkpoint.rows_scanned} matched, up to id {checkpoint.last_id}/{checkpoint.max_id}")
+
+
+@backfill_cli.command("status")
+@click.argument("name", required=False)
+def status_command(name):
+    """Show checkpoints, optionally for a single backfill."""
+    query = BackfillCheckpoint.query.order_by(BackfillCheckpoint.name)
+    if name:
+        query = query.filter_by(name=name)
+    for checkpoint in query:
+        click.echo(f"{checkpoint.name}: {checkpoint.status}, id {checkpoint.last_id}/{checkpoint.max_id}, "
+                   f"{checkpoint.rows_updated} updated, last progress {checkpoint.updated_at}")
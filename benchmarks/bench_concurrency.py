@@ -0,0 +1,174 @@
+"""Compare how many in-flight LLM-backed requests one gunicorn process holds, sync vs gevent.
+
+Starts a fake OpenAI-compatible upstream that answers after a fixed delay, runs
+benchmarks/llm_app.py under a single gunicorn worker of each class, fires concurrent
+requests at it and reports peak upstream concurrency, throughput and latency.
+
+    python benchmarks/bench_concurrency.py --requests 200 --concurrency 100 --delay 1.0
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": json.dumps({"response": "ok"})},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, delay):
+        super().__init__(address, FakeUpstreamHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def reset(self):
+        with self.lock:
+            self.in_flight = 0
+            self.peak = 0
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        body = json.dumps(COMPLETION).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_listening(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def post(url):
+    started = time.monotonic()
+    request = urllib.request.Request(url, data=b"{}", headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            response.read()
+            ok = response.status == 200
+    except OSError:
+        ok = False
+    return ok, time.monotonic() - started
+
+
+def run(worker_class, upstream, args):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "OPEN_AI_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{upstream.server_address[1]}/v1",
+        "LLM_TIMEOUT_SECONDS": "60",
+        "PYTHONPATH": ROOT,
+    })
+    # Uses the project's gunicorn.conf.py, so the gevent run exercises the real settings
+    env.update({
+        "WEB_WORKER_CLASS": worker_class,
+        "WEB_CONCURRENCY": "1",
+        "WEB_WORKER_CONNECTIONS": str(args.concurrency * 2),
+        "WEB_TIMEOUT": "600",
+    })
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--backlog", "2048",
+         "--bind", f"127.0.0.1:{port}", "--access-logfile", "/dev/null", "--log-level", "warning",
+         "benchmarks.llm_app:app"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        wait_until_listening(port)
+        post(f"http://127.0.0.1:{port}/chat")  # warm up the worker
+        upstream.reset()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda _: post(f"http://127.0.0.1:{port}/chat"), range(args.requests)))
+        elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "worker": worker_class,
+        "ok": sum(1 for ok, _ in results if ok),
+        "peak_in_flight": upstream.peak,
+        "throughput_rps": round(len(results) / elapsed, 1),
+        "p50_s": round(statistics.median(latencies), 2),
+        "p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+        "wall_s": round(elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=1.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--workers", nargs="+", default=["sync", "gevent"])
+    args = parser.parse_args()
+
+    upstream = FakeUpstream(("127.0.0.1", 0), args.delay)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, simulated LLM latency {args.delay}s, 1 process")
+    print(f"{'worker':<8} {'ok':>5} {'peak in-flight':>15} {'req/s':>8} {'p50 s':>7} {'p95 s':>7} {'wall s':>7}")
+    for worker_class in args.workers:
+        r = run(worker_class, upstream, args)
+        print(f"{r['worker']:<8} {r['ok']:>5} {r['peak_in_flight']:>15} {r['throughput_rps']:>8} "
+              f"{r['p50_s']:>7} {r['p95_s']:>7} {r['wall_s']:>7}")
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
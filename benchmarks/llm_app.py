@@ -0,0 +1,15 @@
+"""Minimal WSGI app for bench_concurrency.py: one route backed by the real chat_service client.
+
+Point OPENAI_BASE_URL at the fake upstream started by the benchmark.
+"""
+from flask import Flask, jsonify
+
+from chat_service import respond_to_chat_message
+
+app = Flask(__name__)
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    result = respond_to_chat_message([{"role": "user", "content": "Hello"}])
+    return jsonify(result)
@@ -1,11 +1,105 @@
-from typing import Dict
+from typing import Dict, List
+import copy
 import json
 import logging
 from openai import OpenAI
 import os
+import time
+from structured_output import StructuredOutputError, SCHEMAS, parse_structured_output, response_format_kwargs
+from llm_resilience import CircuitBreaker, LLMUnavailableError, ResilientChatClient
+from model_routing import model_router
 
 logger = logging.getLogger(__name__)
-openai_client = OpenAI(api_key=os.environ.get("OPEN_AI_KEY"))
+if os.environ.get("LLM_BACKEND", "openai") == "fake":
+    from fake_llm import FakeOpenAI
+    openai_client = FakeOpenAI(delay=float(os.environ.get("FAKE_LLM_DELAY_SECONDS", 0)))
+else:
+    openai_client = OpenAI(api_key=os.environ.get("OPEN_AI_KEY"))
+
+# Retries are handled by the resilience layer, so the SDK's own retry loop is disabled
+llm_client = ResilientChatClient(
+    openai_client.with_options(max_retries=0),
+    timeout=float(os.environ.get("LLM_TIMEOUT_SECONDS", 30)),
+    max_retries=int(os.environ.get("LLM_MAX_RETRIES", 2)),
+    hedge=os.environ.get("LLM_HEDGE_ENABLED", "false").lower() == "true",
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get("LLM_BREAKER_FAILURE_THRESHOLD", 5)),
+        recovery_timeout=float(os.environ.get("LLM_BREAKER_RECOVERY_SECONDS", 30)),
+    ),
+)
+
+# Served when the LLM is unavailable; schemas without an entry surface the error instead
+DEGRADED_RESPONSES = {
+    "chat_response": {
+        "response": "I'm having trouble responding right now. Please try again in a minute."
+    },
+    "feedback_prompts": {
+        "introduction": "Thank you for taking the time to share your feedback.",
+        "questions": [
+            "What is working well?",
+            "What could be improved?",
+            "What is one specific change you would suggest?"
+        ],
+        "closing": "Is there anything else you would like to add?"
+    },
+}
+
+def _routed_completion(task: str, schema_name: str, messages: List[Dict], **kwargs):
+    """Call the model routed for a task and record its latency and token usage"""
+    model = model_router.select(task)
+    started = time.monotonic()
+    try:
+        response = llm_client.create(
+            model=model,
+            messages=messages,
+            **kwargs,
+            **response_format_kwargs(model, schema_name)
+        )
+    except Exception:
+        model_router.record(task, model, time.monotonic() - started, error=True)
+        raise
+    model_router.record(task, model, time.monotonic() - started, usage=getattr(response, "usage", None))
+    return response
+
+def _complete_json(messages: List[Dict], schema_name: str, task: str) -> Dict:
+    """Run a chat completion and return its schema-validated JSON payload.
+
+    Uses the API's JSON mode or schema where the model supports it, repairs fenced or
+    trailing-text output locally, and only falls back to a cheap repair call when that fails.
+    """
+    try:
+        response = _routed_completion(task, schema_name, messages)
+    except LLMUnavailableError as e:
+        if schema_name not in DEGRADED_RESPONSES:
+            raise
+        logger.warning(f"Serving degraded {schema_name} response: {e}")
+        return copy.deepcopy(DEGRADED_RESPONSES[schema_name])
+
+    content = response.choices[0].message.content
+    logger.debug(f"Raw API response content: {content}")
+
+    try:
+        return parse_structured_output(content, schema_name)
+    except StructuredOutputError as e:
+        logger.warning(f"Local repair failed for {schema_name} output: {e}")
+
+    repair_prompt = f"""The following output was supposed to be a JSON object matching this JSON schema:
+{json.dumps(SCHEMAS[schema_name])}
+
+Output:
+{content}
+
+Return only the corrected JSON object, keeping the original wording wherever possible."""
+
+    repair_response = _routed_completion(
+        "json_repair",
+        schema_name,
+        [{"role": "user", "content": repair_prompt}],
+        max_tokens=1000
+    )
+    repaired = repair_response.choices[0].message.content
+    logger.debug(f"Repaired API response content: {repaired}")
+    return parse_structured_output(repaired, schema_name)
 
 def initiate_user_conversation(user_input: str) -> Dict:
     prompt = f"""You are having a conversation with a user who wants to receive feedback. 
@@ -25,26 +119,64 @@ def initiate_user_conversation(user_input: str) -> Dict:
 
     try:
         logger.info("Initiating user conversation for feedback needs")
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
-        )
+        result = _complete_json([{"role": "user", "content": prompt}], "conversation_summary", "initiate_conversation")
+        logger.info(f"Parsed API response: {result}")
+        return result
+    except StructuredOutputError as e:
+        logger.error(f"Failed to parse JSON response: {e}")
+        return {"error": "Failed to parse JSON response"}
+    except Exception as e:
+        logger.error(f"Error during OpenAI API call: {e}")
+        return {"error": "Error during OpenAI API call"}
+
+def respond_to_chat_message(messages: List[Dict]) -> Dict:
+    """Generate the assistant's next reply from a bounded conversation history"""
+    instructions = {
+        "role": "system",
+        "content": """Respond with a valid JSON object using exactly this structure:
+{
+    "response": "<your next message to the user>"
+}
+Return only valid JSON, no additional text."""
+    }
 
-        content = response.choices[0].message.content
-        logger.debug(f"Raw API response content: {content}")
-
-        try:
-            # Parse the JSON response
-            result = json.loads(content)
-            logger.info(f"Parsed API response: {result}")
-            return result
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
-            return {"error": "Failed to parse JSON response"}
+    try:
+        logger.info("Generating chat response")
+        result = _complete_json(messages + [instructions], "chat_response", "chat_response")
+        logger.info("Successfully parsed chat response")
+        return result
+    except StructuredOutputError as e:
+        logger.error(f"Failed to parse JSON response: {e}")
+        return {"error": "Failed to parse JSON response"}
     except Exception as e:
         logger.error(f"Error during OpenAI API call: {e}")
         return {"error": "Error during OpenAI API call"}
 
+def summarize_conversation(summary: str, turns: List[Dict]) -> str:
+    """Fold older conversation turns into the running summary"""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    prompt = f"""Update the running summary of a feedback conversation with the turns below.
+
+Current summary:
+{summary or "(empty)"}
+
+New turns:
+{transcript}
+
+Please respond with a valid JSON object using exactly this structure:
+{{
+    "summary": "<updated summary>"
+}}
+
+Requirements:
+- Keep every fact, preference and open question that matters for the rest of the conversation
+- Keep the summary under 150 words
+- Return only valid JSON, no additional text
+"""
+
+    logger.info(f"Summarizing {len(turns)} conversation turns")
+    return _complete_json([{"role": "user", "content": prompt}], "conversation_summary", "summarize_conversation")["summary"]
+
 def generate_feedback_prompts(topic: str) -> Dict:
     prompt = f"""Generate a structured set of questions for gathering feedback about: {topic}
 
@@ -65,21 +197,9 @@ Requirements:
     
     try:
         logger.info(f"Generating feedback prompts for topic: {topic}")
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        content = response.choices[0].message.content
-        logger.debug(f"Raw API response content: {content}")
-        
-        try:
-            parsed_content = json.loads(content)
-            logger.info("Successfully parsed feedback prompts")
-            return parsed_content
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse API response as JSON: {e}")
-            raise ValueError("Invalid JSON response from OpenAI API")
+        parsed_content = _complete_json([{"role": "user", "content": prompt}], "feedback_prompts", "feedback_prompts")
+        logger.info("Successfully parsed feedback prompts")
+        return parsed_content
             
     except Exception as e:
         logger.error(f"Error generating feedback prompts: {str(e)}")
@@ -106,21 +226,9 @@ Requirements:
     
     try:
         logger.info("Analyzing feedback content")
-        response = openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        content = response.choices[0].message.content
-        logger.debug(f"Raw API response content: {content}")
-        
-        try:
-            parsed_content = json.loads(content)
-            logger.info("Successfully parsed feedback analysis")
-            return parsed_content
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse API response as JSON: {e}")
-            raise ValueError("Invalid JSON response from OpenAI API")
+        parsed_content = _complete_json([{"role": "user", "content": prompt}], "feedback_analysis", "feedback_analysis")
+        logger.info("Successfully parsed feedback analysis")
+        return parsed_content
             
     except Exception as e:
         logger.error(f"Error analyzing feedback: {str(e)}")
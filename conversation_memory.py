@@ -0,0 +1,149 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Compact on-disk role codes, so long conversations don't repeat role names
+_ROLE_CODES = {"user": "u", "assistant": "a"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+STATE_VERSION = 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+@dataclass
+class ConversationMemory:
+    """Bounded chat history: the last few turns verbatim plus a rolling summary"""
+    summary: str = ""
+    turns: List[Tuple[str, str]] = field(default_factory=list)
+    max_turns: int = 6
+    token_budget: int = 1500
+    summary_token_budget: int = 300
+
+    def add_turn(self, role: str, content: str) -> None:
+        if role not in _ROLE_CODES:
+            raise ValueError(f"Unsupported conversation role: {role}")
+        self.turns.append((role, content))
+
+    def token_count(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(content) for _, content in self.turns)
+
+    def needs_compaction(self) -> bool:
+        return len(self.turns) > self.max_turns or self.token_count() > self.token_budget
+
+    def _over_low_watermark(self) -> bool:
+        # Whole exchanges, at most half the limits, so the next few turns fit without compacting
+        keep_turns = max(2, self.max_turns // 2 // 2 * 2)
+        return len(self.turns) > keep_turns or self.token_count() > self.token_budget // 2
+
+    def compact(self, summarizer: Callable[[str, List[Dict]], str]) -> bool:
+        """Once over budget, fold the oldest turns into the running summary down to half the budget.
+
+        Compacting below the limit means the summarizer runs every few exchanges rather than
+        on every turn past the limit. Always keeps the latest exchange verbatim. Returns True
+        if the summary changed.
+        """
+        if not self.needs_compaction():
+            return False
+        evicted = []
+        while len(self.turns) > 2 and self._over_low_watermark():
+            evicted.append(self.turns.pop(0))
+
+        if not evicted:
+            return False
+
+        evicted_messages = [{"role": role, "content": content} for role, content in evicted]
+        try:
+            new_summary = summarizer(self.summary, evicted_messages)
+        except Exception as e:
+            # Never lose the evicted turns: fall back to appending them to the summary verbatim
+            logger.error(f"Failed to summarize conversation turns: {str(e)}")
+            new_summary = "\n".join(
+                [self.summary] + [f"{role}: {content}" for role, content in evicted]
+            ).strip()
+
+        self.summary = self._truncate_summary(new_summary)
+        return True
+
+    def _truncate_summary(self, summary: str) -> str:
+        max_chars = self.summary_token_budget * 4
+        if len(summary) <= max_chars:
+            return summary
+        # Keep the most recent part of the summary, it carries the latest context
+        return summary[-max_chars:]
+
+    def build_messages(self, system_prompt: str) -> List[Dict]:
+        """Build the chat completion messages: system prompt, summary, then recent turns"""
+        messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {self.summary}"
+            })
+        messages.extend({"role": role, "content": content} for role, content in self.turns)
+        return messages
+
+    def to_state(self) -> str:
+        """Serialize to a compact JSON string for storage"""
+        state = {
+            "v": STATE_VERSION,
+            "s": self.summary,
+            "t": [[_ROLE_CODES[role], content] for role, content in self.turns],
+        }
+        return json.dumps(state, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_state(cls, state: Optional[str], **limits) -> "ConversationMemory":
+        memory = cls(**limits)
+        if not state:
+            return memory
+        try:
+            data = json.loads(state)
+            memory.summary = data.get("s", "")
+            memory.turns = [(_ROLE_NAMES[code], content) for code, content in data.get("t", [])]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Discarding unreadable conversation state: {str(e)}")
+        return memory
+
+
+class ConversationStore:
+    """Loads and saves conversation memory, one row per conversation key"""
+
+    def _limits(self) -> Dict:
+        config = current_app.config
+        return {
+            "max_turns": config.get("CHAT_MEMORY_MAX_TURNS", 6),
+            "token_budget": config.get("CHAT_MEMORY_TOKEN_BUDGET", 1500),
+            "summary_token_budget": config.get("CHAT_MEMORY_SUMMARY_TOKEN_BUDGET", 300),
+        }
+
+    def load(self, conversation_key: str) -> ConversationMemory:
+        from models import ChatConversation
+
+        record = ChatConversation.query.filter_by(conversation_key=conversation_key).first()
+        return ConversationMemory.from_state(record.state if record else None, **self._limits())
+
+    def save(self, conversation_key: str, memory: ConversationMemory) -> None:
+        from models import ChatConversation, db
+
+        record = ChatConversation.query.filter_by(conversation_key=conversation_key).first()
+        if record is None:
+            record = ChatConversation(conversation_key=conversation_key)
+            db.session.add(record)
+        record.state = memory.to_state()
+        record.updated_at = datetime.utcnow()
+        db.session.commit()
+
+
+conversation_store = ConversationStore()
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+
+export_cli = AppGroup("export", help="Export a user's feedback history.")
+
+EXPORT_FORMATS = ("csv", "ndjson")
+MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Every record has the same keys so CSV and NDJSON stay interchangeable
+FIELDS = (
+    "record_type",
+    "request_id",
+    "topic",
+    "status",
+    "created_at",
+    "completed_at",
+    "session_id",
+    "provider_email",
+    "content",
+    "analysis",
+)
+
+# Serialized output is handed to the WSGI server in chunks of roughly this size
+CHUNK_SIZE = 64 * 1024
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _record(**values) -> Dict[str, Any]:
+    return {field: values.get(field) for field in FIELDS}
+
+
+def iter_request_records(user_id: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """One record per feedback request, read through a server-side cursor"""
+    from models import FeedbackRequest
+
+    query = (
+        db.session.query(
+            FeedbackRequest.request_id,
+            FeedbackRequest.topic,
+            FeedbackRequest.status,
+            FeedbackRequest.created_at,
+            FeedbackRequest.ai_context,
+        )
+        .filter(FeedbackRequest.requestor_id == user_id)
+        .order_by(FeedbackRequest.id)
+        .execution_options(yield_per=batch_size, stream_results=True)
+    )
+    for row in query:
+        yield _record(
+            record_type="request",
+            request_id=row.request_id,
+            topic=row.topic,
+            status=row.status,
+            created_at=_isoformat(row.created_at),
+            content=row.ai_context,
+        )
+
+
+def iter_session_records(user_id: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """One record per feedback session on the user's requests, including archived ones.
+
+    Plain column rows are selected instead of ORM entities so nothing accumulates in the
+    identity map; archived content is decompressed row by row.
+    """
+    from archival import decompress_content
+    from models import FeedbackProvider, FeedbackRequest, FeedbackSession, FeedbackSessionArchive
+
+    query = (
+        db.session.query(
+            FeedbackSession.id,
+            FeedbackRequest.request_id,
+            FeedbackRequest.topic,
+            FeedbackSession.created_at,
+            FeedbackSession.completed_at,
+            FeedbackSession._content,
+            FeedbackProvider.provider_email,
+            FeedbackProvider.status,
+            FeedbackSessionArchive.codec,
+            FeedbackSessionArchive.payload,
+        )
+        .join(FeedbackRequest, FeedbackSession.feedback_request_id == FeedbackRequest.id)
+        .outerjoin(FeedbackProvider, FeedbackSession.feedback_provider_id == FeedbackProvider.id)
+        .outerjoin(FeedbackSessionArchive, FeedbackSessionArchive.session_id == FeedbackSession.id)
+        .filter(FeedbackRequest.requestor_id == user_id)
+        .order_by(FeedbackSession.id)
+        .execution_options(yield_per=batch_size, stream_results=True)
+    )
+    for row in query:
+        content = row._content
+        if content is None and row.payload is not None:
+            content = decompress_content(row.codec, row.payload)
+        content = dict(content or {})
+        analysis = content.pop("analysis", None)
+        yield _record(
+            record_type="session",
+            request_id=row.request_id,
+            topic=row.topic,
+            status=row.status,
+            created_at=_isoformat(row.created_at),
+            completed_at=_isoformat(row.completed_at),
+            session_id=row.id,
+            provider_email=row.provider_email,
+            content=content or None,
+            analysis=analysis,
+        )
+
+
+def iter_records(user_id: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    yield from iter_request_records(user_id, batch_size)
+    yield from iter_session_records(user_id, batch_size)
+
+
+def _chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Join small serialized pieces into CHUNK_SIZE byte chunks"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    return _chunked(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+def iter_csv(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    def lines():
+        line = io.StringIO()
+        writer = csv.writer(line)
+        writer.writerow(FIELDS)
+        for record in records:
+            # Nested JSON fields are written as JSON text in a single cell
+            writer.writerow([
+                json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+                for value in (record[field] for field in FIELDS)
+            ])
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+        yield line.getvalue()
+
+    return _chunked(lines())
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into a gzip member on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(user_id: str, fmt: str = "ndjson", compress: bool = False,
+                  batch_size: int = 500) -> Iterator[bytes]:
+    """Serialized export of a user's requests and sessions as a byte generator"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    records = iter_records(user_id, batch_size)
+    chunks = iter_csv(records) if fmt == "csv" else iter_ndjson(records)
+    return gzip_stream(chunks) if compress else chunks
+
+
+def export_filename(fmt: str, compress: bool = False) -> str:
+    name = f"feedback-export-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return f"{name}.gz" if compress else name
+
+
+@export_cli.command("user")
+@click.argument("user")
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="ndjson", show_default=True)
+@click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+@click.option("--output", "-o", default="-", help="Output file, defaults to stdout.")
+@click.option("--batch-size", type=int, default=None, help="Rows fetched per cursor round trip.")
+def export_user_command(user, fmt, compress, output, batch_size):
+    """Export the feedback history of USER (id or email)."""
+    from models import User
+
+    account = db.session.get(User, user) or User.query.filter_by(email=user).first()
+    if account is None:
+        raise click.ClickException(f"No user found for {user}")
+
+    batch_size = batch_size or current_app.config.get("EXPORT_BATCH_SIZE", 500)
+    with click.open_file(output, "wb") as f:
+        for chunk in stream_export(account.id_string, fmt, compress, batch_size):
+            f.write(chunk)
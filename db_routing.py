@@ -0,0 +1,197 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+_ROUTE_KEY = "db_route"
+_WROTE_KEY = "db_route_wrote"
+_STICKY_SESSION_KEY = "_db_primary_until"
+_PINNED_KEY = "db_route_pinned"
+
+# Zero when the replica has replayed everything it received, otherwise the age of the last replayed commit
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def default_lag_probe(engine) -> float:
+    """Replication lag of a replica in seconds; non-Postgres replicas are assumed current"""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.execute(_POSTGRES_LAG_SQL).scalar() or 0.0)
+
+
+class ReplicaRouter:
+    """Chooses a read replica for read-only work, falling back to the primary.
+
+    Replicas are regular Flask-SQLAlchemy binds listed in REPLICA_BINDS. Their lag is probed
+    at most every REPLICA_LAG_CHECK_INTERVAL seconds; a replica that lags more than
+    REPLICA_MAX_LAG_SECONDS or can't be reached is skipped until the next probe.
+    """
+
+    def __init__(self, lag_probe: Callable = default_lag_probe, clock: Callable[[], float] = time.monotonic):
+        self.lag_probe = lag_probe
+        self.clock = clock
+        self.binds = []
+        self.max_lag = 5.0
+        self.check_interval = 2.0
+        self.sticky_seconds = 10.0
+        self._lag: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+
+    def init_app(self, app) -> None:
+        self.binds = list(app.config.get("REPLICA_BINDS", []))
+        self.max_lag = app.config.get("REPLICA_MAX_LAG_SECONDS", 5.0)
+        self.check_interval = app.config.get("REPLICA_LAG_CHECK_INTERVAL", 2.0)
+        self.sticky_seconds = app.config.get("READ_YOUR_WRITES_SECONDS", 10.0)
+        self._lag.clear()
+        app.extensions["replica_router"] = self
+
+    def lag(self, bind: str, engine) -> Optional[float]:
+        """Cached lag for a replica, or None when it couldn't be probed"""
+        now = self.clock()
+        with self._lock:
+            cached = self._lag.get(bind)
+            if cached is not None and now - cached[0] < self.check_interval:
+                return cached[1]
+        try:
+            lag = self.lag_probe(engine)
+        except SQLAlchemyError as e:
+            logger.warning(f"Replica {bind} is unavailable: {str(e)}")
+            lag = None
+        with self._lock:
+            self._lag[bind] = (now, lag)
+        return lag
+
+    def engine_for_read(self, engines):
+        """A healthy replica engine, or None to use the primary"""
+        healthy = []
+        for bind in self.binds:
+            engine = engines.get(bind)
+            if engine is None:
+                continue
+            lag = self.lag(bind, engine)
+            if lag is not None and lag <= self.max_lag:
+                healthy.append(engine)
+        if not healthy:
+            self.primary_fallbacks += 1
+            return None
+        self.replica_reads += 1
+        return random.choice(healthy)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lag = {bind: value for bind, (_, value) in self._lag.items()}
+        return {
+            "replicas": self.binds,
+            "lag": lag,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
+
+
+def _is_sticky() -> bool:
+    """Whether this browser committed recently and must read its own writes from the primary"""
+    return has_request_context() and flask_session.get(_STICKY_SESSION_KEY, 0) > time.time()
+
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """Session that sends plain SELECTs to a replica while use_replica() is active"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self.info.get(_ROUTE_KEY) != "replica":
+            return engine
+        if self._flushing or self.info.get(_WROTE_KEY) or not isinstance(clause, Select):
+            return engine
+        if clause._for_update_arg is not None:
+            return engine
+
+        engines = self._db.engines
+        # Only models on the default bind have replicas
+        if engine is not engines.get(None):
+            return engine
+        router = current_app.extensions.get("replica_router")
+        if router is None or not router.binds or _is_sticky():
+            return engine
+        # One choice per transaction: replicas lag differently, so switching between them
+        # could show a row and then lose it again
+        if _PINNED_KEY not in self.info:
+            self.info[_PINNED_KEY] = router.engine_for_read(engines)
+        return self.info[_PINNED_KEY] or engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(session, flush_context):
+    # Later reads in the same transaction must see the rows just flushed
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _make_sticky(session):
+    session.info.pop(_PINNED_KEY, None)
+    if not session.info.pop(_WROTE_KEY, False) or not has_request_context():
+        return
+    router = current_app.extensions.get("replica_router")
+    if router is not None and router.binds:
+        flask_session[_STICKY_SESSION_KEY] = time.time() + router.sticky_seconds
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_write(session):
+    session.info.pop(_WROTE_KEY, None)
+    session.info.pop(_PINNED_KEY, None)
+
+
+@contextmanager
+def _route(target: str):
+    from extensions import db
+
+    info = db.session.info
+    previous = info.get(_ROUTE_KEY)
+    info[_ROUTE_KEY] = target
+    try:
+        yield
+    finally:
+        info[_ROUTE_KEY] = previous
+
+
+def use_replica():
+    """Context manager sending reads in the block to a replica when one is healthy"""
+    return _route("replica")
+
+
+def use_primary():
+    """Context manager forcing reads in the block to the primary"""
+    return _route("primary")
+
+
+def read_only(view):
+    """Route decorator: GET and HEAD requests read from a replica"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(*args, **kwargs)
+        with use_replica():
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+replica_router = ReplicaRouter()
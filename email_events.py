@@ -0,0 +1,178 @@
+import binascii
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from flask import Blueprint, current_app, jsonify, request
+from sendgrid.helpers.eventwebhook import EventWebhook, EventWebhookHeader
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import EmailDeliveryStatus
+
+logger = logging.getLogger(__name__)
+
+email_events_bp = Blueprint("email_events", __name__)
+
+# Later stages win; a bounce or spam report is never overwritten by a stray earlier event
+STATUS_RANKS = {
+    "processed": 1,
+    "deferred": 2,
+    "delivered": 3,
+    "open": 4,
+    "click": 5,
+    "unsubscribe": 6,
+    "group_unsubscribe": 6,
+    "bounce": 8,
+    "dropped": 8,
+    "spamreport": 9,
+}
+UNDELIVERABLE_STATUSES = ("bounce", "dropped", "spamreport")
+
+_webhooks: Dict[str, EventWebhook] = {}
+
+
+def verify_signature(payload: str) -> bool:
+    """Check the ECDSA signature SendGrid puts on every event webhook POST"""
+    public_key = current_app.config.get("SENDGRID_WEBHOOK_PUBLIC_KEY")
+    if not public_key:
+        logger.error("SENDGRID_WEBHOOK_PUBLIC_KEY is not set; rejecting event webhook")
+        return False
+    signature = request.headers.get(EventWebhookHeader.SIGNATURE)
+    timestamp = request.headers.get(EventWebhookHeader.TIMESTAMP)
+    if not signature or not timestamp:
+        return False
+    try:
+        webhook = _webhooks.get(public_key)
+        if webhook is None:
+            webhook = _webhooks[public_key] = EventWebhook(public_key)
+        return webhook.verify_signature(payload, signature, timestamp)
+    except (ValueError, binascii.Error) as e:
+        logger.warning(f"Could not verify event webhook signature: {str(e)}")
+        return False
+
+
+def _earliest(current, value):
+    return value if current is None or value < current else current
+
+
+def coalesce_events(events: Iterable[Dict]) -> List[Dict]:
+    """Fold a batch of events into one row per (message id, request id)"""
+    rows = {}
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        name = event.get("event")
+        rank = STATUS_RANKS.get(name)
+        # sg_message_id is the X-Message-Id of the send plus a per-recipient suffix
+        message_id = str(event.get("sg_message_id") or "").split(".", 1)[0]
+        if rank is None or not message_id:
+            continue
+        request_id = str(event.get("request_id") or "")[:36]
+        try:
+            at = datetime.utcfromtimestamp(int(event.get("timestamp")))
+        except (TypeError, ValueError):
+            at = datetime.utcnow()
+
+        row = rows.get((message_id, request_id))
+        if row is None:
+            row = rows[(message_id, request_id)] = {
+                "message_id": message_id[:100],
+                "request_id": request_id,
+                "email": (event.get("email") or "").lower()[:120] or None,
+                "status": name,
+                "status_rank": rank,
+                "reason": None,
+                "event_count": 0,
+                "delivered_at": None,
+                "opened_at": None,
+                "last_event_at": at,
+            }
+        row["event_count"] += 1
+        if rank >= row["status_rank"]:
+            row["status"] = name
+            row["status_rank"] = rank
+            if event.get("reason"):
+                row["reason"] = str(event["reason"])[:255]
+        if name == "delivered":
+            row["delivered_at"] = _earliest(row["delivered_at"], at)
+        elif name in ("open", "click"):
+            row["opened_at"] = _earliest(row["opened_at"], at)
+        row["last_event_at"] = max(row["last_event_at"], at)
+    # Consistent key order keeps concurrent upserts from deadlocking on each other's rows
+    return [rows[key] for key in sorted(rows)]
+
+
+def upsert_delivery_statuses(rows: List[Dict], chunk_size: int = 500) -> None:
+    """Merge coalesced rows with multi-row INSERT ... ON CONFLICT DO UPDATE statements"""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise RuntimeError(f"Delivery status upsert is not supported on {dialect}")
+
+    table = EmailDeliveryStatus.__table__
+    for start in range(0, len(rows), chunk_size):
+        statement = insert(table).values(rows[start:start + chunk_size])
+        excluded = statement.excluded
+        newer = excluded.status_rank >= table.c.status_rank
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.message_id, table.c.request_id],
+            set_={
+                "status": case((newer, excluded.status), else_=table.c.status),
+                "status_rank": case((newer, excluded.status_rank), else_=table.c.status_rank),
+                "reason": case((newer, func.coalesce(excluded.reason, table.c.reason)), else_=table.c.reason),
+                "email": func.coalesce(table.c.email, excluded.email),
+                "event_count": table.c.event_count + excluded.event_count,
+                "delivered_at": func.coalesce(table.c.delivered_at, excluded.delivered_at),
+                "opened_at": func.coalesce(table.c.opened_at, excluded.opened_at),
+                "last_event_at": case((excluded.last_event_at > table.c.last_event_at, excluded.last_event_at),
+                                      else_=table.c.last_event_at),
+            },
+        )
+        db.session.execute(statement)
+    db.session.commit()
+
+
+def undeliverable_emails(emails: Iterable[str]) -> Set[str]:
+    """Addresses whose most recent message bounced, was dropped or reported as spam"""
+    lowered = {email.lower() for email in emails if email}
+    if not lowered:
+        return set()
+    latest = {}
+    rows = (
+        db.session.query(EmailDeliveryStatus.email, EmailDeliveryStatus.status)
+        .filter(EmailDeliveryStatus.email.in_(lowered))
+        .order_by(EmailDeliveryStatus.last_event_at)
+    )
+    for email, status in rows:
+        latest[email] = status
+    return {email for email, status in latest.items() if status in UNDELIVERABLE_STATUSES}
+
+
+@email_events_bp.route("/webhooks/sendgrid/events", methods=["POST"])
+def sendgrid_events():
+    payload = request.get_data(as_text=True)
+    if not verify_signature(payload):
+        return jsonify({"error": "Invalid signature"}), 403
+    try:
+        events = json.loads(payload)
+    except ValueError:
+        return jsonify({"error": "Invalid JSON"}), 400
+    if not isinstance(events, list):
+        return jsonify({"error": "Expected a list of events"}), 400
+
+    rows = coalesce_events(events)
+    if rows:
+        try:
+            upsert_delivery_statuses(rows)
+        except Exception as e:
+            # A non-2xx response makes SendGrid retry the whole batch later
+            db.session.rollback()
+            logger.error(f"Failed to store {len(rows)} delivery statuses: {str(e)}")
+            return jsonify({"error": "Failed to store events"}), 500
+    return jsonify({"events": len(events), "rows": len(rows)}), 200
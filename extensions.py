@@ -1,3 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_socketio import SocketIO
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+socketio = SocketIO()
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+_WORD_RE = re.compile(r"[A-Za-z]{4,}")
+
+
+def _last_user_message(messages: List[Dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+def _schema_name(messages: List[Dict], response_format) -> str:
+    if response_format and response_format.get("type") == "json_schema":
+        return response_format["json_schema"]["name"]
+    prompt = _last_user_message(messages)
+    if '"themes"' in prompt:
+        return "feedback_analysis"
+    if '"questions"' in prompt:
+        return "feedback_prompts"
+    if '"summary"' in prompt:
+        return "conversation_summary"
+    return "chat_response"
+
+
+def _payload(schema_name: str, text: str) -> Dict:
+    words = sorted(set(word.lower() for word in _WORD_RE.findall(text)))
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+    if schema_name == "feedback_analysis":
+        return {
+            "themes": words[:3] or ["general"],
+            "action_items": [f"Follow up on {word}" for word in words[:2]],
+            "summary": f"Fake analysis {digest} of {len(text)} characters.",
+        }
+    if schema_name == "feedback_prompts":
+        return {
+            "introduction": "Thanks for sharing your feedback.",
+            "questions": ["What went well?", "What could be improved?"],
+            "closing": "Anything else?",
+        }
+    if schema_name == "conversation_summary":
+        return {"summary": f"Fake summary {digest}."}
+    return {"response": f"Fake response {digest}."}
+
+
+class _Completions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, messages: List[Dict], response_format=None, timeout=None, **kwargs):
+        if self._owner.delay:
+            time.sleep(self._owner.delay)
+        with self._owner._lock:
+            self._owner.calls += 1
+        schema_name = _schema_name(messages, response_format)
+        content = json.dumps(_payload(schema_name, _last_user_message(messages)))
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+        )
+
+
+class FakeOpenAI:
+    """Offline stand-in for the OpenAI client, selected with LLM_BACKEND=fake.
+
+    Answers with deterministic, schema-valid JSON so jobs like `flask reanalyze` run in
+    tests and locally without network access.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def with_options(self, **kwargs) -> "FakeOpenAI":
+        return self
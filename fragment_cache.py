@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional, Set, Tuple
+
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from db_routing import use_primary
+
+try:
+    import redis
+except ImportError:  # The shared backend is optional; the in-process LRU always works
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+ScopeKey = Tuple[str, object]
+
+_PENDING_KEY = "fragment_cache_pending"
+
+
+class LRUStore:
+    """Thread-safe in-process LRU for rendered fragments, with an optional per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            expires_at = self.clock() + self.ttl if self.ttl else None
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class FragmentCache:
+    """Caches rendered template fragments under a per-scope version counter.
+
+    Scopes are things like ("user", user_id) or ("request", feedback_request_id). Writes to
+    FeedbackRequest, FeedbackProvider and FeedbackSession bump the versions of the scopes
+    they affect, so stale fragments are never read again and simply age out of the LRU.
+    With FRAGMENT_CACHE_REDIS_URL set, versions and fragments are shared across workers.
+
+    Without it, versions live in each process's memory: a commit made by another gunicorn
+    worker or a CLI job (archive, reanalyze, backfill) can't invalidate this process's
+    fragments. Local entries then expire after FRAGMENT_CACHE_LOCAL_TTL seconds, which
+    bounds how long such fragments stay stale; run more than one process only with redis.
+    """
+
+    def __init__(self):
+        self.local = LRUStore()
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+        self._redis = None
+        self.ttl = 3600
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get("FRAGMENT_CACHE_ENABLED", True)
+        self.ttl = app.config.get("FRAGMENT_CACHE_TTL", 3600)
+
+        redis_url = app.config.get("FRAGMENT_CACHE_REDIS_URL")
+        # Shared versions make local entries safe to keep; per-process versions need a short TTL
+        local_ttl = app.config.get("FRAGMENT_CACHE_LOCAL_TTL", None if redis_url else 30)
+        self.local = LRUStore(app.config.get("FRAGMENT_CACHE_MAX_ENTRIES", 1024), ttl=local_ttl)
+        if redis_url:
+            if redis is None:
+                logger.error("FRAGMENT_CACHE_REDIS_URL is set but the redis package is not installed")
+            else:
+                self._redis = redis.Redis.from_url(redis_url)
+
+        register_invalidation_hooks(self)
+        app.extensions["fragment_cache"] = self
+
+    @staticmethod
+    def _scope_name(scope: ScopeKey) -> str:
+        return f"{scope[0]}:{scope[1]}"
+
+    def version(self, scope: ScopeKey) -> int:
+        name = self._scope_name(scope)
+        if self._redis is not None:
+            try:
+                return int(self._redis.get(f"fragver:{name}") or 0)
+            except redis.RedisError as e:
+                logger.warning(f"Fragment cache version lookup failed: {str(e)}")
+                return -1  # Uncacheable this time
+        with self._versions_lock:
+            return self._versions.get(name, 0)
+
+    def bump(self, scope: ScopeKey) -> None:
+        name = self._scope_name(scope)
+        if self._redis is not None:
+            try:
+                self._redis.incr(f"fragver:{name}")
+            except redis.RedisError as e:
+                logger.error(f"Fragment cache invalidation failed for {name}: {str(e)}")
+        with self._versions_lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get_or_render(self, name: str, scope: ScopeKey, render: Callable[[], str]) -> Markup:
+        """Return the cached fragment for the scope's current version, rendering it on a miss"""
+        if not self.enabled:
+            return Markup(render())
+
+        version = self.version(scope)
+        if version < 0:
+            return Markup(render())
+        key = f"frag:{name}:{self._scope_name(scope)}:v{version}"
+
+        html = self.local.get(key)
+        if html is None and self._redis is not None:
+            try:
+                cached = self._redis.get(key)
+                if cached is not None:
+                    html = cached.decode("utf-8")
+                    self.local.set(key, html)
+            except redis.RedisError as e:
+                logger.warning(f"Fragment cache read failed: {str(e)}")
+
+        if html is not None:
+            self.hits += 1
+            return Markup(html)
+
+        self.misses += 1
+        # Versions are bumped on primary commits; rendering from a lagging replica would
+        # cache stale rows under the new version
+        with use_primary():
+            html = str(render())
+        self.local.set(key, html)
+        if self._redis is not None:
+            try:
+                self._redis.set(key, html, ex=self.ttl)
+            except redis.RedisError as e:
+                logger.warning(f"Fragment cache write failed: {str(e)}")
+        return Markup(html)
+
+
+def affected_scopes(obj) -> Set[ScopeKey]:
+    """Scopes whose fragments render data from this model instance"""
+    from models import FeedbackProvider, FeedbackRequest, FeedbackSession, FeedbackSessionArchive
+
+    scopes = set()
+    if isinstance(obj, FeedbackRequest):
+        scopes.add(("user", obj.requestor_id))
+        scopes.add(("request", obj.id))
+        # Invitees' pending lists show the request's topic
+        session = object_session(obj)
+        if session is not None and obj.id is not None:
+            with session.no_autoflush:
+                emails = session.query(FeedbackProvider.provider_email).filter(
+                    FeedbackProvider.feedback_request_id == obj.id, FeedbackProvider.provider_email.isnot(None))
+                scopes.update(("email", email.lower()) for email, in emails)
+    elif isinstance(obj, FeedbackProvider):
+        scopes.add(("request", obj.feedback_request_id))
+        if obj.provider_email:
+            scopes.add(("email", obj.provider_email.lower()))
+    elif isinstance(obj, FeedbackSession):
+        scopes.add(("request", obj.feedback_request_id))
+    elif isinstance(obj, FeedbackSessionArchive):
+        # Archived content renders through its session; usually already in the identity map
+        session = object_session(obj)
+        if session is not None:
+            with session.no_autoflush:
+                owner = session.get(FeedbackSession, obj.session_id)
+            if owner is not None:
+                scopes.add(("request", owner.feedback_request_id))
+    return scopes
+
+
+# Caches receiving invalidations; hooks are registered on the Session class only once
+_registered_caches = weakref.WeakSet()
+_hooks_registered = False
+
+
+def register_invalidation_hooks(cache: FragmentCache) -> None:
+    """Collect affected scopes on flush and bump them once the transaction commits.
+
+    Bumping only after commit keeps a concurrent render from caching pre-commit data
+    under the new version.
+    """
+    global _hooks_registered
+    _registered_caches.add(cache)
+    if _hooks_registered:
+        return
+    _hooks_registered = True
+
+    @event.listens_for(Session, "after_flush")
+    def _collect(session, flush_context):
+        pending = session.info.setdefault(_PENDING_KEY, set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            pending.update(affected_scopes(obj))
+
+    @event.listens_for(Session, "after_commit")
+    def _bump(session):
+        scopes = [scope for scope in session.info.pop(_PENDING_KEY, set()) if scope[1] is not None]
+        for registered in list(_registered_caches):
+            for scope in scopes:
+                registered.bump(scope)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session):
+        session.info.pop(_PENDING_KEY, None)
+
+
+fragment_cache = FragmentCache()
@@ -2,6 +2,7 @@
 
 import json
 import os
+import time
 
 import requests
 from app import db
@@ -24,8 +25,17 @@ print(f"DEV_REDIRECT_URL: {DEV_REDIRECT_URL}")
 
 client = WebApplicationClient(GOOGLE_CLIENT_ID)
 
+# Outbound calls to Google must never hold a worker (or greenlet) indefinitely
+GOOGLE_REQUEST_TIMEOUT = float(os.environ.get("GOOGLE_REQUEST_TIMEOUT", 10))
+DISCOVERY_CACHE_SECONDS = 3600
+_provider_cfg = {"value": None, "fetched_at": 0.0}
+
 def get_google_provider_cfg():
-    return requests.get(GOOGLE_DISCOVERY_URL).json()
+    # The discovery document rarely changes; don't fetch it on every login and callback
+    if _provider_cfg["value"] is None or time.monotonic() - _provider_cfg["fetched_at"] > DISCOVERY_CACHE_SECONDS:
+        _provider_cfg["value"] = requests.get(GOOGLE_DISCOVERY_URL, timeout=GOOGLE_REQUEST_TIMEOUT).json()
+        _provider_cfg["fetched_at"] = time.monotonic()
+    return _provider_cfg["value"]
 
 @google_auth_bp.route("/login")
 def login():
@@ -54,12 +64,13 @@ def callback():
         headers=headers,
         data=body,
         auth=(GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET),
+        timeout=GOOGLE_REQUEST_TIMEOUT,
     )
     client.parse_request_body_response(json.dumps(token_response.json()))
 
     userinfo_endpoint = google_provider_cfg["userinfo_endpoint"]
     uri, headers, body = client.add_token(userinfo_endpoint)
-    userinfo_response = requests.get(uri, headers=headers, data=body)
+    userinfo_response = requests.get(uri, headers=headers, data=body, timeout=GOOGLE_REQUEST_TIMEOUT)
 
     if userinfo_response.json().get("email_verified"):
         unique_id = userinfo_response.json()["sub"]
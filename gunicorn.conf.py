@@ -0,0 +1,40 @@
+# Gunicorn configuration. Routes mostly wait on OpenAI, SendGrid and Google, so the default
+# is cooperative gevent workers: one process holds many in-flight requests instead of one.
+# Set WEB_WORKER_CLASS=sync to fall back to the old blocking workers.
+import os
+
+worker_class = os.environ.get("WEB_WORKER_CLASS", "gevent")
+# Socket.IO's polling handshake must reach the worker that opened it, so more than one worker
+# per dyno needs sticky sessions (heroku features:enable http-session-affinity). Otherwise
+# scale with dynos and SOCKETIO_MESSAGE_QUEUE. WEB_CONCURRENCY is ignored: Heroku sets it itself.
+sticky_sessions = os.environ.get("SOCKETIO_STICKY_SESSIONS") == "1"
+requested_workers = int(os.environ.get("WEB_WORKERS", 1))
+workers = requested_workers if sticky_sessions else 1
+# Concurrent requests per gevent worker; ignored by sync workers
+worker_connections = int(os.environ.get("WEB_WORKER_CONNECTIONS", 200))
+# LLM calls have their own deadlines (LLM_TIMEOUT_SECONDS); this only catches stuck workers
+timeout = int(os.environ.get("WEB_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        # Make psycopg2 yield to other greenlets while waiting on the database
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        server.log.info("Patched psycopg2 for gevent in worker %s", worker.pid)
+
+
+def on_starting(server):
+    if requested_workers > workers:
+        server.log.warning("WEB_WORKERS=%s ignored: Socket.IO needs SOCKETIO_STICKY_SESSIONS=1 "
+                           "for more than one worker; running 1", requested_workers)
+    if workers > 1 and not os.environ.get("FRAGMENT_CACHE_REDIS_URL"):
+        # Fragment cache invalidations are per process without a shared version store
+        server.log.warning("Running %s workers without FRAGMENT_CACHE_REDIS_URL: the dashboard "
+                           "fragment cache is disabled", workers)
+    elif not os.environ.get("FRAGMENT_CACHE_REDIS_URL"):
+        server.log.info("No FRAGMENT_CACHE_REDIS_URL: writes from CLI jobs reach cached dashboard fragments "
+                        "only after FRAGMENT_CACHE_LOCAL_TTL seconds (default 30)")
@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Optional
+
+import click
+from flask import Response, current_app, jsonify, make_response, request
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from extensions import db
+from models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+idempotency_cli = AppGroup("idempotency", help="Manage stored Idempotency-Key responses.")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def _digest(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _scoped_key(header_key: str) -> str:
+    """Keys are scoped to the user and endpoint so clients can't collide or read each other's responses"""
+    user_id = current_user.get_id() if current_user.is_authenticated else "anonymous"
+    return _digest(user_id.encode(), request.path.encode(), header_key.encode())
+
+
+def _request_hash() -> str:
+    return _digest(request.method.encode(), request.path.encode(), request.get_data())
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    response = Response(record.response_body, status=record.status_code, content_type=record.content_type)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _claim(key: str, request_hash: str) -> Optional[IdempotencyKey]:
+    """Insert the in-flight marker; returns None when claimed, otherwise the existing row"""
+    now = datetime.utcnow()
+    ttl = current_app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400)
+    try:
+        db.session.add(IdempotencyKey(key=key, request_hash=request_hash, locked_at=now,
+                                      expires_at=now + timedelta(seconds=ttl)))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(IdempotencyKey, key)
+
+
+def _take_over(record: IdempotencyKey) -> bool:
+    """Claim a row whose first request was abandoned (worker died) using a compare-and-set"""
+    updated = IdempotencyKey.query.filter(
+        IdempotencyKey.key == record.key,
+        IdempotencyKey.status_code.is_(None),
+        IdempotencyKey.locked_at == record.locked_at,
+    ).update({"locked_at": datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated == 1
+
+
+def _wait_for_result(key: str) -> Optional[IdempotencyKey]:
+    """Poll an in-flight key until it completes, is released, or the wait times out"""
+    deadline = time.monotonic() + current_app.config.get("IDEMPOTENCY_WAIT_SECONDS", 10)
+    poll = current_app.config.get("IDEMPOTENCY_POLL_INTERVAL", 0.2)
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        # End the transaction so each poll sees the other request's commit
+        db.session.rollback()
+        record = db.session.get(IdempotencyKey, key)
+        if record is None or record.status_code is not None:
+            return record
+    return db.session.get(IdempotencyKey, key)
+
+
+def _release(key: str) -> None:
+    """Forget a key whose request failed, so a retry runs it again"""
+    try:
+        db.session.rollback()
+        IdempotencyKey.query.filter_by(key=key, status_code=None).delete(synchronize_session=False)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Failed to release idempotency key: {str(e)}")
+
+
+def _store(key: str, response: Response) -> None:
+    try:
+        IdempotencyKey.query.filter_by(key=key).update({
+            "status_code": response.status_code,
+            "response_body": response.get_data(as_text=True),
+            "content_type": response.content_type,
+        }, synchronize_session=False)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Failed to store idempotent response: {str(e)}")
+
+
+def _acquire(key: str, request_hash: str):
+    """Return None once this request owns the key, or the response to send instead"""
+    lock_timeout = timedelta(seconds=current_app.config.get("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", 300))
+    for _ in range(3):
+        record = _claim(key, request_hash)
+        if record is None:
+            return None
+        if record.expires_at < datetime.utcnow():
+            IdempotencyKey.query.filter_by(key=key, expires_at=record.expires_at).delete(synchronize_session=False)
+            db.session.commit()
+            continue
+        if record.request_hash != request_hash:
+            return jsonify({"error": f"{IDEMPOTENCY_HEADER} was already used with a different request"}), 422
+        if record.status_code is not None:
+            return _replay(record)
+        if record.locked_at < datetime.utcnow() - lock_timeout:
+            if _take_over(record):
+                return None
+            continue
+
+        record = _wait_for_result(key)
+        if record is None:
+            continue  # The first attempt failed and released the key; run it ourselves
+        if record.status_code is not None:
+            return _replay(record)
+        response = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+        response.headers["Retry-After"] = "1"
+        return response, 409
+    return jsonify({"error": f"Could not acquire {IDEMPOTENCY_HEADER}, please retry"}), 409
+
+
+def idempotent(view):
+    """Route decorator: replay the stored response for a repeated Idempotency-Key header.
+
+    A concurrent duplicate waits for the in-flight request instead of doing the work twice.
+    Requests without the header run as usual; 5xx responses are not stored so they can be retried.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not header_key:
+            return view(*args, **kwargs)
+        if len(header_key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        key = _scoped_key(header_key)
+        early_response = _acquire(key, _request_hash())
+        if early_response is not None:
+            return early_response
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            _release(key)
+        else:
+            _store(key, response)
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size: int = 1000) -> int:
+    """Delete expired keys in small batches and return how many were removed"""
+    removed = 0
+    while True:
+        keys = [row.key for row in IdempotencyKey.query.with_entities(IdempotencyKey.key)
+                .filter(IdempotencyKey.expires_at < datetime.utcnow()).limit(batch_size)]
+        if not keys:
+            return removed
+        IdempotencyKey.query.filter(IdempotencyKey.key.in_(keys)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(keys)
+
+
+@idempotency_cli.command("purge")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+def purge_command(batch_size):
+    """Delete expired idempotency keys."""
+    click.echo(f"Removed {purge_expired_keys(batch_size)} expired idempotency keys")
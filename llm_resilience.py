@@ -0,0 +1,306 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: the request may succeed if sent again
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TimeoutError,
+)
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when the LLM cannot be reached and no cached response is available"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised when the circuit breaker is open and calls fail fast"""
+
+
+class LatencyWindow:
+    """Thread-safe rolling window of call latencies, in seconds.
+
+    With max_age set, samples older than max_age seconds are ignored.
+    """
+
+    def __init__(self, size: int = 200, max_age: Optional[float] = None, clock=time.monotonic):
+        self._samples = deque(maxlen=size)
+        self._max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _prune(self) -> None:
+        if self._max_age is None:
+            return
+        cutoff = self._clock() - self._max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append((self._clock(), seconds))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._prune()
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            self._prune()
+            samples = sorted(value for _, value in self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures, half-open probe after a cool-down"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                # Let exactly one probe through to test the upstream
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """End a half-open probe that neither succeeded nor failed, so the next call can probe"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"LLM circuit breaker opened after {self._consecutive_failures} failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "open_for_seconds": round(self._clock() - self._opened_at, 1) if state == self.OPEN else None,
+            }
+
+
+class ResilientChatClient:
+    """Wraps chat.completions.create with deadlines, jittered retries, hedging and a circuit breaker.
+
+    Successful responses are kept in a small LRU cache and served when the breaker is open
+    or retries are exhausted, so identical prompts keep working through an outage.
+    """
+
+    def __init__(self, client, timeout: float = 30.0, max_retries: int = 2, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, hedge: bool = False, hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 cache_size: int = 256, max_workers: int = 8):
+        self._client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+        self._model_latency = {}
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                       "cache_hits": 0, "short_circuited": 0}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    @staticmethod
+    def _cache_key(kwargs: Dict) -> str:
+        # Everything that shapes the response (response_format, max_tokens, ...) is part of the key
+        payload = json.dumps({key: value for key, value in kwargs.items() if key != "timeout"},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str):
+        with self._cache_lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+            return response
+
+    def _cache_put(self, key: str, response) -> None:
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spreads retries from many workers so they don't hit the API in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _timed_call(self, kwargs: Dict, timeout: float):
+        started = time.monotonic()
+        response = self._client.chat.completions.create(timeout=timeout, **kwargs)
+        elapsed = time.monotonic() - started
+        self.latency.record(elapsed)
+        self._latency_for(kwargs.get("model")).record(elapsed)
+        return response
+
+    def _latency_for(self, model: str) -> LatencyWindow:
+        # Hedge delays are per model, different tiers have very different latency profiles
+        with self._stats_lock:
+            if model not in self._model_latency:
+                self._model_latency[model] = LatencyWindow()
+            return self._model_latency[model]
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        latency = self._latency_for(model)
+        if not self.hedge or len(latency) < self.hedge_min_samples:
+            return None
+        return latency.percentile(self.hedge_percentile)
+
+    def _call_once(self, kwargs: Dict, timeout: float):
+        delay = self._hedge_delay(kwargs.get("model"))
+        if delay is None or delay >= timeout:
+            return self._timed_call(kwargs, timeout)
+
+        primary = self._executor.submit(self._timed_call, kwargs, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        # The primary is slower than p95: race a second identical request against it
+        self._count("hedges")
+        hedged = self._executor.submit(self._timed_call, kwargs, max(timeout - delay, 0.1))
+        pending = {primary, hedged}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def create(self, **kwargs) -> Any:
+        """Drop-in replacement for client.chat.completions.create"""
+        self._count("calls")
+        cache_key = self._cache_key(kwargs)
+
+        if not self.breaker.allow_request():
+            self._count("short_circuited")
+            return self._fallback(cache_key, CircuitOpenError("LLM circuit breaker is open"))
+
+        deadline = time.monotonic() + self.timeout * (self.max_retries + 1)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = self._call_once(kwargs, min(self.timeout, remaining))
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+                self._count("failures")
+                self.breaker.record_failure()
+                logger.warning(f"LLM call failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                if attempt == self.max_retries or not self.breaker.allow_request():
+                    break
+                self._count("retries")
+                time.sleep(min(self._backoff(attempt), max(deadline - time.monotonic(), 0)))
+                continue
+            except Exception:
+                # Non-retryable errors say nothing about upstream health, but must not leave a probe pending
+                self.breaker.release_probe()
+                raise
+
+            self.breaker.record_success()
+            self._cache_put(cache_key, response)
+            return response
+
+        return self._fallback(cache_key, LLMUnavailableError(f"LLM call failed: {last_error}"))
+
+    def _fallback(self, cache_key: str, error: LLMUnavailableError):
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            self._count("cache_hits")
+            logger.warning(f"Serving cached LLM response: {error}")
+            return cached
+        raise error
+
+    def get_state(self) -> Dict:
+        """Breaker state, latency percentiles and counters for monitoring"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        return {
+            "circuit": self.breaker.snapshot(),
+            "latency_ms": {
+                "p50": round(p50 * 1000) if p50 is not None else None,
+                "p95": round(p95 * 1000) if p95 is not None else None,
+                "samples": len(self.latency),
+            },
+            "hedging_enabled": self.hedge,
+            "counters": stats,
+        }
@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from llm_resilience import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Model tiers, ordered from highest quality to fastest. Overridable per deployment.
+MODEL_TIERS = {
+    "quality": os.environ.get("LLM_MODEL_QUALITY", "gpt-4"),
+    "balanced": os.environ.get("LLM_MODEL_BALANCED", "gpt-4o"),
+    "fast": os.environ.get("LLM_MODEL_FAST", "gpt-4o-mini"),
+}
+
+
+@dataclass(frozen=True)
+class TaskRoute:
+    """Preferred tiers for a task, in order, and the p95 latency it should stay under"""
+    tiers: Tuple[str, ...]
+    slo_ms: int
+
+
+ROUTING_TABLE = {
+    # Simple, latency-sensitive tasks go straight to the fast tier
+    "initiate_conversation": TaskRoute(tiers=("fast",), slo_ms=3000),
+    "summarize_conversation": TaskRoute(tiers=("fast",), slo_ms=3000),
+    "json_repair": TaskRoute(tiers=("fast",), slo_ms=3000),
+    "feedback_prompts": TaskRoute(tiers=("fast",), slo_ms=3000),
+    "chat_response": TaskRoute(tiers=("balanced", "fast"), slo_ms=4000),
+    # Analysis runs after submission and benefits most from the stronger model
+    "feedback_analysis": TaskRoute(tiers=("quality", "balanced", "fast"), slo_ms=20000),
+}
+
+
+class _ModelStats:
+    def __init__(self, window_seconds: float, clock):
+        self.latency = LatencyWindow(size=200, max_age=window_seconds, clock=clock)
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+class ModelRouter:
+    """Picks a model per task and falls back to faster tiers when the observed p95 breaks the SLO.
+
+    Latency samples expire after window_seconds, so a demoted tier is retried once its
+    slow samples age out.
+    """
+
+    def __init__(self, routing_table: Dict[str, TaskRoute] = None, tiers: Dict[str, str] = None,
+                 min_samples: int = 10, window_seconds: float = 300.0, clock=time.monotonic):
+        self.routing_table = routing_table or ROUTING_TABLE
+        self.tiers = tiers or MODEL_TIERS
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _get_stats(self, task: str, model: str) -> _ModelStats:
+        with self._lock:
+            key = (task, model)
+            if key not in self._stats:
+                self._stats[key] = _ModelStats(self.window_seconds, self._clock)
+            return self._stats[key]
+
+    def _route(self, task: str) -> TaskRoute:
+        try:
+            return self.routing_table[task]
+        except KeyError:
+            raise ValueError(f"No model route configured for task: {task}")
+
+    def _breaches_slo(self, task: str, model: str, slo_ms: int) -> bool:
+        stats = self._get_stats(task, model)
+        if len(stats.latency) < self.min_samples:
+            return False
+        return stats.latency.percentile(95) * 1000 > slo_ms
+
+    def select(self, task: str) -> str:
+        """Return the model to use for a task"""
+        route = self._route(task)
+        models = [self.tiers[tier] for tier in route.tiers]
+        for model in models[:-1]:
+            if not self._breaches_slo(task, model, route.slo_ms):
+                return model
+            logger.info(f"{model} p95 exceeds the {route.slo_ms}ms SLO for {task}, falling back")
+        return models[-1]
+
+    def record(self, task: str, model: str, seconds: float, usage=None, error: bool = False) -> None:
+        """Record latency and token usage for one call"""
+        stats = self._get_stats(task, model)
+        stats.latency.record(seconds)
+        with self._lock:
+            stats.calls += 1
+            if error:
+                stats.errors += 1
+            if usage is not None:
+                stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def get_stats(self) -> Dict:
+        """Per-task SLO, current model choice and per-model latency and token usage"""
+        report = {}
+        for task, route in self.routing_table.items():
+            models = {}
+            for tier in route.tiers:
+                model = self.tiers[tier]
+                stats = self._get_stats(task, model)
+                p95: Optional[float] = stats.latency.percentile(95)
+                models[model] = {
+                    "tier": tier,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                    "samples": len(stats.latency),
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                }
+            report[task] = {"slo_ms": route.slo_ms, "selected_model": self.select(task), "models": models}
+        return report
+
+
+model_router = ModelRouter()
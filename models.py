@@ -24,13 +24,95 @@ class FeedbackRequest(db.Model):
 
 class FeedbackProvider(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    # Add other fields as necessary
+    feedback_request_id = db.Column(db.Integer, db.ForeignKey('feedback_request.id'), index=True)
+    provider_email = db.Column(db.String(120), index=True)
+    status = db.Column(db.String(20), default='invited')
+    invitation_sent = db.Column(db.DateTime, default=datetime.utcnow)
+    access_token = db.Column(db.String(100))
+    token_expiry = db.Column(db.DateTime)
+
+    feedback_request = db.relationship('FeedbackRequest', backref=db.backref('providers', lazy=True))
+    feedback_session = db.relationship('FeedbackSession', uselist=False, back_populates='feedback_provider')
 
 class FeedbackSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     feedback_request_id = db.Column(db.Integer, db.ForeignKey('feedback_request.id'))
     provider_id = db.Column(db.String(100), db.ForeignKey('user.id_string'))
-    content = db.Column(db.JSON)
+    feedback_provider_id = db.Column(db.Integer, db.ForeignKey('feedback_provider.id'))
+    # Archived sessions keep a stub row here; the content lives in feedback_session_archive
+    _content = db.Column('content', db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, index=True)
+
+    feedback_provider = db.relationship('FeedbackProvider', back_populates='feedback_session')
+    archive = db.relationship('FeedbackSessionArchive', uselist=False, cascade='all, delete-orphan')
+
+    @property
+    def content(self):
+        """Session content, transparently hydrated from the cold archive when archived"""
+        if self.archived_at is None or self._content is not None:
+            return self._content
+        if getattr(self, '_hydrated_content', None) is None and self.archive is not None:
+            self._hydrated_content = self.archive.load()
+        return getattr(self, '_hydrated_content', None)
+
+    @content.setter
+    def content(self, value):
+        # Writing content brings an archived session back to the hot table
+        self._content = value
+        self._hydrated_content = None
+        if self.archived_at is not None:
+            self.archived_at = None
+            self.archive = None
+
+class FeedbackSessionArchive(db.Model):
+    session_id = db.Column(db.Integer, db.ForeignKey('feedback_session.id'), primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    original_size = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def load(self):
+        from archival import decompress_content
+        return decompress_content(self.codec, self.payload)
+
+class ChatConversation(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_key = db.Column(db.String(150), unique=True, nullable=False)
+    state = db.Column(db.Text, nullable=False, default='')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BackfillCheckpoint(db.Model):
+    name = db.Column(db.String(100), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    max_id = db.Column(db.Integer)
+    rows_scanned = db.Column(db.Integer, nullable=False, default=0)
+    rows_updated = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+class IdempotencyKey(db.Model):
+    # sha256 of (user, path, Idempotency-Key header)
+    key = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.SmallInteger)  # NULL while the first request is in flight
+    response_body = db.Column(db.Text)
+    content_type = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
 
+class EmailDeliveryStatus(db.Model):
+    # One row per SendGrid message and feedback request, upserted from the event webhook
+    message_id = db.Column(db.String(100), primary_key=True)
+    request_id = db.Column(db.String(36), primary_key=True, default='')
+    email = db.Column(db.String(120), index=True)
+    status = db.Column(db.String(20), nullable=False)
+    status_rank = db.Column(db.SmallInteger, nullable=False, default=0)
+    reason = db.Column(db.String(255))
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_at = db.Column(db.DateTime)
+    opened_at = db.Column(db.DateTime)
+    last_event_at = db.Column(db.DateTime)
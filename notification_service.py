@@ -3,7 +3,7 @@ from typing import List, Dict
 from flask import current_app, Blueprint, render_template, jsonify
 from flask_login import login_required, current_user
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import CustomArg, Mail
 import uuid
 
 logging.basicConfig(
@@ -93,9 +93,13 @@ def send_email_with_template(template_id: str, recipients: List[str], dynamic_da
         )
         message.dynamic_template_data = dynamic_data
         message.template_id = template_id
+        # Echoed back on every event webhook POST, so delivery status can be tied to the request
+        message.custom_arg = CustomArg('request_id', request_id)
 
         # Send email using SendGrid
         sg = SendGridAPIClient(api_key=current_app.config['SENDGRID_API_KEY'])
+        # Bound the SendGrid call so a slow API can't hold the request indefinitely
+        sg.client.timeout = current_app.config.get('SENDGRID_TIMEOUT', 10)
         response = sg.send(message)
 
         # Log SendGrid response
@@ -0,0 +1,203 @@
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app, has_request_context, request
+from werkzeug.exceptions import TooManyRequests
+
+try:
+    import redis
+except ImportError:  # The shared store is optional; the in-process counters always work
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Requests allowed per window, as "<count>/<unit>"
+DEFAULT_LIMITS = {
+    "feedback_session": "60/minute",
+    "feedback_token_ip": "20/minute",
+    "feedback_token_prefix": "10/minute",
+    # Every chat message is an LLM call
+    "chat_message": "20/minute",
+}
+
+
+def parse_limit(value: str) -> Tuple[int, int]:
+    """Parse "60/minute" into (60, 60)"""
+    count, _, unit = value.partition("/")
+    unit = unit.strip().rstrip("s")
+    if unit not in _UNITS:
+        raise ValueError(f"Unknown rate limit unit in {value!r}")
+    return int(count), _UNITS[unit]
+
+
+class SlidingWindowCounter:
+    """In-process sliding-window counters, bounded in size like an LRU.
+
+    Each key keeps counts for the current and previous fixed window; the estimate weights
+    the previous window by how much of it still overlaps the sliding window. That's O(1)
+    memory per key, unlike keeping a timestamp per request.
+    """
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.time):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window: int) -> float:
+        """Record a hit and return the sliding-window count including it"""
+        now = self.clock()
+        index = int(now // window)
+        with self._lock:
+            current_index, current, previous = self._data.get(key, (index, 0, 0))
+            if index != current_index:
+                previous = current if index == current_index + 1 else 0
+                current = 0
+            current += 1
+            self._data[key] = (index, current, previous)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+        overlap = 1 - (now % window) / window
+        return current + previous * overlap
+
+
+class RateLimiter:
+    """Named sliding-window limits checked before a view touches the database.
+
+    With RATE_LIMIT_REDIS_URL set the counters are shared across workers; if redis is
+    unreachable the in-process counters take over rather than letting traffic through.
+    """
+
+    def __init__(self):
+        self.local = SlidingWindowCounter()
+        self._redis = None
+        self.enabled = True
+        self.limits: Dict[str, Tuple[int, int]] = {name: parse_limit(value) for name, value in DEFAULT_LIMITS.items()}
+        self.exempt_networks = []
+        self.exempt_token_prefixes = set()
+        self.proxy_hops = 0
+        self.rejected: Dict[str, int] = {}
+        self._warned_proxy = False
+
+    def init_app(self, app) -> None:
+        self.enabled = app.config.get("RATE_LIMIT_ENABLED", True)
+        self.local = SlidingWindowCounter(app.config.get("RATE_LIMIT_MAX_KEYS", 100000))
+        limits = dict(DEFAULT_LIMITS, **app.config.get("RATE_LIMITS", {}))
+        self.limits = {name: parse_limit(value) for name, value in limits.items()}
+        self.exempt_networks = [ipaddress.ip_network(value, strict=False)
+                                for value in app.config.get("RATE_LIMIT_EXEMPT_IPS", [])]
+        self.exempt_token_prefixes = set(app.config.get("RATE_LIMIT_EXEMPT_TOKEN_PREFIXES", []))
+        self.proxy_hops = app.config.get("RATE_LIMIT_PROXY_HOPS", 0)
+        self.rejected = {}
+        self._warned_proxy = False
+
+        redis_url = app.config.get("RATE_LIMIT_REDIS_URL")
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                logger.error("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+            else:
+                self._redis = redis.Redis.from_url(redis_url)
+        app.extensions["rate_limiter"] = self
+
+    def client_ip(self) -> str:
+        """The client address, taken from X-Forwarded-For entries appended by trusted proxies"""
+        if self.proxy_hops:
+            forwarded = request.access_route
+            if len(forwarded) >= self.proxy_hops:
+                return forwarded[-self.proxy_hops]
+        elif "X-Forwarded-For" in request.headers and not self._warned_proxy:
+            # Behind a proxy every client would share the proxy's address, and one bucket
+            self._warned_proxy = True
+            logger.warning("X-Forwarded-For is present but RATE_LIMIT_PROXY_HOPS is 0; "
+                           "per-IP rate limits are keyed on the proxy address")
+        return request.remote_addr or ""
+
+    def is_exempt_ip(self, ip: str) -> bool:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return any(address in network for network in self.exempt_networks)
+
+    def _shared_hit(self, key: str, window: int) -> Optional[float]:
+        now = time.time()
+        index = int(now // window)
+        try:
+            pipeline = self._redis.pipeline()
+            pipeline.incr(f"rl:{key}:{index}")
+            pipeline.expire(f"rl:{key}:{index}", window * 2)
+            pipeline.get(f"rl:{key}:{index - 1}")
+            current, _, previous = pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit store unavailable, using local counters: {str(e)}")
+            return None
+        overlap = 1 - (now % window) / window
+        return int(current) + int(previous or 0) * overlap
+
+    def hit(self, name: str, key: str) -> Optional[int]:
+        """Count a hit; returns seconds to wait when the limit is exceeded, otherwise None"""
+        limit, window = self.limits[name]
+        scoped = f"{name}:{key}"
+        count = self._shared_hit(scoped, window) if self._redis is not None else None
+        if count is None:
+            count = self.local.hit(scoped, window)
+        if count <= limit:
+            return None
+        self.rejected[name] = self.rejected.get(name, 0) + 1
+        return max(1, math.ceil(window - time.time() % window))
+
+    def check(self, name: str, key: str) -> None:
+        """Raise 429 Too Many Requests when the key is over the named limit"""
+        if not self.enabled:
+            return
+        retry_after = self.hit(name, key)
+        if retry_after is not None:
+            logger.warning(f"Rate limit {name} exceeded for {key}")
+            raise TooManyRequests(retry_after=retry_after)
+
+    def check_ip(self, name: str) -> None:
+        ip = self.client_ip()
+        if not self.is_exempt_ip(ip):
+            self.check(name, ip)
+
+    def check_token(self, token: str) -> None:
+        """Limit token verification per client IP and per token prefix"""
+        if not has_request_context():
+            return
+        self.check_ip("feedback_token_ip")
+        prefix = token[:8]
+        if prefix not in self.exempt_token_prefixes:
+            self.check("feedback_token_prefix", prefix)
+
+    def get_stats(self) -> Dict:
+        return {"limits": {name: f"{limit}/{window}s" for name, (limit, window) in self.limits.items()},
+                "rejected": dict(self.rejected)}
+
+
+def rate_limit(name: str):
+    """Route decorator: per-IP sliding-window limit, checked before the view runs"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get("rate_limiter")
+            if limiter is not None:
+                limiter.check_ip(name)
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,102 @@
+import logging
+from typing import Dict, List, Tuple
+
+from flask import request
+from flask_login import current_user
+from flask_socketio import emit, join_room
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from extensions import socketio
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "realtime_pending_events"
+
+PendingEvent = Tuple[str, str, Dict]
+
+
+def request_room(feedback_request_id: int) -> str:
+    return f"request:{feedback_request_id}"
+
+
+def user_room(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+@socketio.on("connect")
+def handle_connect():
+    # Dashboard updates go to a per-user room; anonymous providers get nothing pushed
+    if not current_user.is_authenticated:
+        return False
+    join_room(user_room(current_user.id_string))
+
+
+@socketio.on("subscribe")
+def handle_subscribe(data):
+    from models import FeedbackRequest
+
+    request_id = (data or {}).get("request_id")
+    feedback_request = FeedbackRequest.query.filter_by(request_id=request_id).first()
+    if not feedback_request or feedback_request.requestor_id != current_user.id_string:
+        logger.warning(f"Rejected realtime subscription to {request_id} from {request.sid}")
+        emit("subscription_error", {"request_id": request_id})
+        return
+    join_room(request_room(feedback_request.id))
+    emit("subscribed", {"request_id": request_id})
+
+
+def _changed(obj, attribute: str) -> bool:
+    return inspect(obj).attrs[attribute].history.has_changes()
+
+
+def _archive_rewritten(obj) -> bool:
+    """Whether a loaded archive of this session had its payload replaced (not newly archived)"""
+    archive = obj.__dict__.get("archive")
+    return archive is not None and bool(inspect(archive).attrs["payload"].history.deleted)
+
+
+def collect_events(obj) -> List[PendingEvent]:
+    """Small delta events for a flushed model instance, as (event, room, payload)"""
+    from models import FeedbackProvider, FeedbackRequest, FeedbackSession
+
+    events = []
+    if isinstance(obj, FeedbackProvider) and _changed(obj, "status"):
+        events.append(("provider_status", request_room(obj.feedback_request_id),
+                       {"provider_id": obj.id, "status": obj.status}))
+    elif isinstance(obj, FeedbackSession):
+        # Completion reaches the dashboard through the provider's own status change
+        room = request_room(obj.feedback_request_id)
+        content = obj._content if isinstance(obj._content, dict) else {}
+        if (_changed(obj, "_content") and content.get("analysis")) or _archive_rewritten(obj):
+            events.append(("analysis_ready", room,
+                           {"provider_id": obj.feedback_provider_id, "session_id": obj.id}))
+    elif isinstance(obj, FeedbackRequest) and _changed(obj, "status"):
+        events.append(("request_status", user_room(obj.requestor_id),
+                       {"request_id": obj.request_id, "status": obj.status}))
+    return events
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        pending.extend(collect_events(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session):
+    events = session.info.pop(_PENDING_KEY, [])
+    # CLI jobs without a Socket.IO server (or message queue) have nobody to push to
+    if not events or socketio.server is None:
+        return
+    for name, room, payload in events:
+        try:
+            socketio.emit(name, payload, to=room)
+        except Exception as e:
+            logger.error(f"Failed to publish {name} to {room}: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.orm.attributes import flag_modified
+
+from archival import compress_content, decompress_content
+from backfill import Progress, load_checkpoint
+from extensions import db
+from models import FeedbackSession, FeedbackSessionArchive
+
+logger = logging.getLogger(__name__)
+
+Candidate = Tuple[int, str]
+
+
+class RateLimiter:
+    """Token bucket shared by all worker threads; acquire() blocks until a call may start"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+def _session_content(row) -> Dict:
+    if row._content is not None:
+        return row._content
+    if row.payload is not None:
+        return decompress_content(row.codec, row.payload)
+    return {}
+
+
+def iter_candidate_pages(after_id: int, page_size: int) -> Iterator[Tuple[int, List[Candidate], int]]:
+    """Yield (last id, [(session id, feedback text)], rows read) pages of completed sessions.
+
+    Keyset pagination instead of one long cursor: every page is written and committed before
+    the next is read, which a server-side cursor would not survive. Plain column rows keep the
+    identity map empty; archived content is decompressed per row.
+    """
+    last_id = after_id
+    while True:
+        rows = (
+            db.session.query(
+                FeedbackSession.id,
+                FeedbackSession._content,
+                FeedbackSessionArchive.codec,
+                FeedbackSessionArchive.payload,
+            )
+            .outerjoin(FeedbackSessionArchive, FeedbackSessionArchive.session_id == FeedbackSession.id)
+            .filter(FeedbackSession.id > last_id, FeedbackSession.completed_at.isnot(None))
+            .order_by(FeedbackSession.id)
+            .limit(page_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield last_id, [(row.id, _session_content(row)) for row in rows], len(rows)
+
+
+def _needs_analysis(content: Dict, tag: str) -> Optional[str]:
+    """The feedback text to analyze, or None when there is none or it's already at this tag"""
+    feedback = content.get("feedback")
+    if not feedback or content.get("analysis_version") == tag:
+        return None
+    return feedback
+
+
+def _write_results(results: Dict[int, Dict], tag: str) -> None:
+    """Store new analyses; archived sessions are rewritten in the archive so they stay cold"""
+    for session in FeedbackSession.query.filter(FeedbackSession.id.in_(list(results))):
+        analysis = results[session.id]
+        if session.archived_at is not None and session.archive is not None:
+            content = dict(session.archive.load())
+            content.update(analysis=analysis, analysis_version=tag)
+            codec, payload, original_size = compress_content(content)
+            session.archive.codec = codec
+            session.archive.payload = payload
+            session.archive.original_size = original_size
+            # Only the archive row changes; flag the session so cache and realtime hooks see it
+            flag_modified(session, "archived_at")
+        else:
+            content = dict(session._content or {})
+            content.update(analysis=analysis, analysis_version=tag)
+            session._content = content
+
+
+def reanalyze_sessions(tag: str, analyze: Callable[[str], Dict], workers: int = 4, rate: float = 2.0,
+                       batch_size: int = 50, limit: Optional[int] = None, restart: bool = False,
+                       on_progress: Optional[Callable[[Dict, Progress], None]] = None) -> Dict:
+    """Re-run analysis over completed sessions, resuming from the checkpoint for this tag.
+
+    Each page of sessions is analyzed concurrently (at most `rate` calls per second across
+    all workers), then its results and the checkpoint are committed together.
+    """
+    checkpoint = load_checkpoint(f"reanalyze:{tag}", restart)
+    if checkpoint.status == 'completed':
+        return {"analyzed": 0, "failed": 0, "skipped": 0, "status": checkpoint.status}
+
+    remaining = FeedbackSession.query.filter(
+        FeedbackSession.id > checkpoint.last_id, FeedbackSession.completed_at.isnot(None)
+    ).count()
+    progress = Progress(total=min(remaining, limit) if limit else remaining)
+    limiter = RateLimiter(rate)
+    stats = {"analyzed": 0, "failed": 0, "skipped": 0}
+
+    def run(item: Candidate):
+        session_id, feedback = item
+        limiter.acquire()
+        try:
+            return session_id, analyze(feedback)
+        except Exception as e:
+            logger.error(f"Re-analysis failed for session {session_id}: {str(e)}")
+            return session_id, None
+
+    # Sessions that failed keep the checkpoint just below them so a rerun retries them;
+    # sessions analyzed after them are skipped then since they're already at this tag
+    retry_from = None
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reanalyze") as pool:
+        for last_id, page, scanned in iter_candidate_pages(checkpoint.last_id, batch_size):
+            if limit is not None and progress.done >= limit:
+                break
+            todo = []
+            for session_id, content in page:
+                feedback = _needs_analysis(content, tag)
+                if feedback is None:
+                    stats["skipped"] += 1
+                else:
+                    todo.append((session_id, feedback))
+            # End the read transaction before the slow part so no connection sits idle in it
+            db.session.commit()
+
+            results = {}
+            for session_id, analysis in pool.map(run, todo):
+                if analysis is None:
+                    stats["failed"] += 1
+                    if retry_from is None:
+                        retry_from = session_id - 1
+                else:
+                    results[session_id] = analysis
+            if results:
+                _write_results(results, tag)
+
+            checkpoint.last_id = last_id if retry_from is None else retry_from
+            checkpoint.rows_scanned += scanned
+            checkpoint.rows_updated += len(results)
+            checkpoint.updated_at = datetime.utcnow()
+            db.session.commit()
+
+            stats["analyzed"] += len(results)
+            progress.advance(scanned)
+            logger.info(f"Re-analysis {tag}: sessions up to {last_id}, {progress.format()}")
+            if on_progress:
+                on_progress(stats, progress)
+        else:
+            if retry_from is None:
+                checkpoint.status = 'completed'
+                checkpoint.completed_at = datetime.utcnow()
+                db.session.commit()
+
+    stats["status"] = checkpoint.status
+    stats["elapsed"] = progress.elapsed
+    return stats
+
+
+@click.command("reanalyze")
+@click.option("--tag", required=True, help="Name of this analysis version, e.g. prompt-v2; also the checkpoint name.")
+@click.option("--workers", type=int, default=4, show_default=True, help="Concurrent LLM calls.")
+@click.option("--rate", type=float, default=2.0, show_default=True, help="Maximum LLM calls per second.")
+@click.option("--batch-size", type=int, default=50, show_default=True, help="Sessions per page and commit.")
+@click.option("--limit", type=int, default=None, help="Stop after about this many sessions.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint; sessions already at this tag are still skipped.")
+@with_appcontext
+def reanalyze_command(tag, workers, rate, batch_size, limit, restart):
+    """Re-run feedback analysis over historical sessions."""
+    from chat_service import analyze_feedback
+
+    def report(stats, progress):
+        click.echo(f"{progress.format()} - {stats['analyzed']} analyzed, "
+                   f"{stats['skipped']} skipped, {stats['failed']} failed")
+
+    stats = reanalyze_sessions(tag, analyze_feedback, workers, rate, batch_size, limit, restart, on_progress=report)
+    click.echo(f"Re-analysis {tag} {stats['status']}: {stats['analyzed']} analyzed, "
+               f"{stats['skipped']} skipped, {stats['failed']} failed")
@@ -0,0 +1,257 @@
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from flask import Blueprint, abort, current_app, g, has_app_context, render_template, request, send_from_directory
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:  # gevent is only installed where the gevent workers run
+    gevent_monkey = None
+
+logger = logging.getLogger(__name__)
+
+profiler_bp = Blueprint("profiler", __name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+FrameKey = Tuple[str, str, int]
+
+
+def _native(module: str, name: str):
+    """The unpatched threading primitive, so sampling stays preemptive under gevent"""
+    if gevent_monkey is not None and gevent_monkey.is_module_patched(module):
+        return gevent_monkey.get_original(module, name)
+    return getattr(__import__(module), name)
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a native background thread via sys._current_frames.
+
+    Under gevent the sampled thread runs every greenlet of the worker, so profiles taken
+    under concurrent load include other requests' stacks.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: List[Tuple[float, Tuple[FrameKey, ...]]] = []
+        self._running = False
+        self._sleep = _native("time", "sleep")
+
+    def start(self) -> None:
+        self._running = True
+        self.started = time.perf_counter()
+        _native("_thread", "start_new_thread")(self._run, ())
+
+    def stop(self) -> None:
+        self._running = False
+        self.stopped = time.perf_counter()
+
+    def _run(self) -> None:
+        own_file = __file__
+        while self._running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename != own_file:
+                        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                self.samples.append((time.perf_counter(), tuple(reversed(stack))))
+            self._sleep(self.interval)
+
+
+def to_speedscope(name: str, sampler: StackSampler, queries: List[Dict]) -> Dict:
+    """Build a speedscope file: a sampled CPU/wall profile plus an evented SQL lane"""
+    frames = []
+    frame_index = {}
+
+    def index_of(key) -> int:
+        if key not in frame_index:
+            frame_index[key] = len(frames)
+            frame_name, file, line = key
+            frames.append({"name": frame_name, "file": file, "line": line})
+        return frame_index[key]
+
+    samples = []
+    weights = []
+    previous = sampler.started
+    for timestamp, stack in sampler.samples:
+        if timestamp > sampler.stopped:
+            break  # The sampler thread may take one more sample after stop()
+        samples.append([index_of(key) for key in stack])
+        weights.append(round((timestamp - previous) * 1000, 3))
+        previous = timestamp
+    duration = round((sampler.stopped - sampler.started) * 1000, 3)
+
+    sql_events = []
+    for query in queries:
+        frame = index_of((query["statement"][:120], "SQL", 0))
+        start = query["start_ms"]
+        sql_events.append({"type": "O", "frame": frame, "at": start})
+        sql_events.append({"type": "C", "frame": frame, "at": round(start + query["duration_ms"], 3)})
+
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "aifeedback request_profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [
+            {"type": "sampled", "name": name, "unit": "milliseconds", "startValue": 0,
+             "endValue": duration, "samples": samples, "weights": weights},
+            {"type": "evented", "name": "SQL", "unit": "milliseconds", "startValue": 0,
+             "endValue": duration, "events": sql_events},
+        ],
+    }
+
+
+def _profile_dir() -> str:
+    return current_app.config.get("PROFILER_DIR") or os.path.join(current_app.instance_path, "profiles")
+
+
+def _is_admin() -> bool:
+    token = current_app.config.get("PROFILER_TOKEN")
+    supplied = request.headers.get(PROFILE_TOKEN_HEADER)
+    if token and supplied and hmac.compare_digest(token, supplied):
+        return True
+    admins = current_app.config.get("PROFILER_ADMIN_EMAILS", [])
+    return current_user.is_authenticated and current_user.email.lower() in admins
+
+
+def _should_profile() -> bool:
+    if request.blueprint in (profiler_bp.name, "assets") or request.endpoint == "static":
+        return False
+    if request.headers.get(PROFILE_HEADER):
+        return _is_admin()
+    # Sampling covers signed-in users only; anonymous feedback providers' requests are never recorded
+    rate = current_app.config.get("PROFILER_SAMPLE_RATE", 0.0)
+    return rate > 0 and current_user.is_authenticated and random.random() < rate
+
+
+def _start_profile() -> None:
+    if not current_app.config.get("PROFILER_ENABLED", True) or not _should_profile():
+        return
+    sampler = StackSampler(_native("_thread", "get_ident")(), current_app.config.get("PROFILER_INTERVAL", 0.001))
+    g._profile = {"sampler": sampler, "queries": [], "started_at": datetime.utcnow()}
+    sampler.start()
+
+
+def _finish_profile(response):
+    profile = g.pop("_profile", None)
+    if profile is None:
+        return response
+    sampler = profile["sampler"]
+    sampler.stop()
+
+    profile_id = f"{profile['started_at']:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    name = f"{request.method} {request.path}"
+    queries = profile["queries"]
+    meta = {
+        "id": profile_id,
+        "name": name,
+        "status": response.status_code,
+        "started_at": profile["started_at"].isoformat(),
+        "duration_ms": round((sampler.stopped - sampler.started) * 1000, 1),
+        "samples": len(sampler.samples),
+        "query_count": len(queries),
+        "query_ms": round(sum(query["duration_ms"] for query in queries), 1),
+        "queries": queries,
+    }
+    try:
+        directory = _profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{profile_id}.speedscope.json"), "w") as f:
+            json.dump(to_speedscope(name, sampler, queries), f)
+        with open(os.path.join(directory, f"{profile_id}.meta.json"), "w") as f:
+            json.dump(meta, f)
+        _prune(directory, current_app.config.get("PROFILER_MAX_PROFILES", 200))
+        response.headers["X-Profile-Id"] = profile_id
+    except OSError as e:
+        logger.error(f"Failed to write request profile: {str(e)}")
+    return response
+
+
+def _abandon_profile(exc) -> None:
+    profile = g.pop("_profile", None)
+    if profile is not None:
+        profile["sampler"].stop()
+
+
+def _prune(directory: str, keep: int) -> None:
+    metas = sorted(name for name in os.listdir(directory) if name.endswith(".meta.json"))
+    for meta in metas[:-keep] if keep else []:
+        profile_id = meta[:-len(".meta.json")]
+        for suffix in (".meta.json", ".speedscope.json"):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and "_profile" in g:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("profile_query_start")
+    if not starts or not (has_app_context() and "_profile" in g):
+        return
+    start = starts.pop()
+    sampler = g._profile["sampler"]
+    # Statements only; bound parameters can contain user data
+    g._profile["queries"].append({
+        "statement": " ".join(statement.split()),
+        "start_ms": round((start - sampler.started) * 1000, 3),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+    })
+
+
+def _require_admin() -> None:
+    if not _is_admin():
+        abort(404)
+
+
+@profiler_bp.route("/")
+def profile_index():
+    _require_admin()
+    directory = _profile_dir()
+    profiles = []
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory), reverse=True):
+            if name.endswith(".meta.json"):
+                with open(os.path.join(directory, name)) as f:
+                    profiles.append(json.load(f))
+    return render_template("profiles.html", profiles=profiles)
+
+
+@profiler_bp.route("/<profile_id>.<kind>.json")
+def profile_file(profile_id, kind):
+    _require_admin()
+    if kind not in ("speedscope", "meta"):
+        abort(404)
+    return send_from_directory(_profile_dir(), f"{profile_id}.{kind}.json", as_attachment=kind == "speedscope")
+
+
+def init_profiler(app) -> None:
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_abandon_profile)
+    app.register_blueprint(profiler_bp, url_prefix="/_profiles")
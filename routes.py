@@ -1,14 +1,32 @@
 import logging
 import uuid
-from datetime import datetime
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for, current_app
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, render_template, jsonify, request, redirect, url_for, current_app, session, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from models import db, FeedbackRequest, FeedbackProvider, FeedbackSession, User
-from chat_service import generate_feedback_prompts, analyze_feedback, openai_client, initiate_user_conversation
+from chat_service import (
+    generate_feedback_prompts,
+    analyze_feedback,
+    openai_client,
+    llm_client,
+    initiate_user_conversation,
+    respond_to_chat_message,
+    summarize_conversation,
+)
+from conversation_memory import conversation_store
+from db_routing import read_only, use_replica
+from data_export import EXPORT_FORMATS, MIMETYPES, export_filename, stream_export
+from fragment_cache import fragment_cache
+from idempotency import idempotent
+from rate_limiting import rate_limit
+from model_routing import model_router
 from notification_service import (
     send_feedback_request_email,
+    send_feedback_reminder_email,
 )
-from auth_utils import create_feedback_token, verify_feedback_token
+from email_events import undeliverable_emails
+from auth_utils import create_feedback_token, generate_feedback_token, verify_feedback_token
 import json
 
 logger = logging.getLogger(__name__)
@@ -19,10 +37,41 @@ main = Blueprint('main', __name__)
 def index():
     return render_template('index.html')
 
+@main.route('/health/llm')
+def llm_health():
+    state = llm_client.get_state()
+    state['routing'] = model_router.get_stats()
+    status_code = 503 if state['circuit']['state'] == 'open' else 200
+    return jsonify(state), status_code
+
 @main.route('/dashboard')
+@read_only
 @login_required
 def dashboard():
-    return render_template('dashboard.html')
+    user_id = current_user.id_string
+    email = current_user.email
+
+    # List fragments only query the DB when a relevant row changed since they were cached
+    my_requests_html = fragment_cache.get_or_render(
+        'dashboard_requests',
+        ('user', user_id),
+        lambda: render_template(
+            '_dashboard_requests.html',
+            requests=FeedbackRequest.query.filter_by(requestor_id=user_id)
+            .order_by(FeedbackRequest.created_at.desc()).all()
+        )
+    )
+    pending_html = fragment_cache.get_or_render(
+        'dashboard_pending',
+        ('email', email.lower()),
+        lambda: render_template(
+            '_dashboard_pending.html',
+            pending=FeedbackProvider.query.options(joinedload(FeedbackProvider.feedback_request))
+            .filter_by(provider_email=email, status='invited')
+            .order_by(FeedbackProvider.invitation_sent.desc()).all()
+        )
+    )
+    return render_template('dashboard.html', my_requests_html=my_requests_html, pending_html=pending_html)
 
 @main.route('/initiate_conversation', methods=['POST'])
 @login_required
@@ -37,6 +86,7 @@ def initiate_conversation():
 
 @main.route('/request_feedback', methods=['POST'])
 @login_required
+@idempotent
 def request_feedback():
     request_id = str(uuid.uuid4())
     try:
@@ -57,10 +107,19 @@ def request_feedback():
             requestor_id=current_user.id_string
         )
         db.session.add(feedback_request)
+        db.session.flush()
+
+        # The invitee's link carries their access token, which submissions are matched by
+        provider = FeedbackProvider(feedback_request_id=feedback_request.id, provider_email=recipient_email)
+        db.session.add(provider)
+        db.session.flush()
+        token = generate_feedback_token()
+        provider.access_token = token
+        provider.token_expiry = datetime.utcnow() + timedelta(days=7)
         db.session.commit()
 
         # Generate feedback URL
-        feedback_url = url_for('main.feedback_session', request_id=request_id, _external=True)
+        feedback_url = url_for('main.feedback_session', request_id=request_id, token=token, _external=True)
 
         # Send feedback request email
         send_feedback_request_email(
@@ -75,25 +134,249 @@ def request_feedback():
         logger.error(f"Failed to request feedback: {str(e)}", extra={"request_id": request_id})
         return jsonify({"error": "Failed to request feedback"}), 500
 
+def _render_providers_fragment(feedback_request):
+    return fragment_cache.get_or_render(
+        'feedback_providers',
+        ('request', feedback_request.id),
+        lambda: render_template(
+            '_feedback_providers.html',
+            # Archived sessions' content comes from their archive rows: load those in one query
+            providers=FeedbackProvider.query.options(
+                joinedload(FeedbackProvider.feedback_session).selectinload(FeedbackSession.archive)
+            )
+            .filter_by(feedback_request_id=feedback_request.id)
+            .order_by(FeedbackProvider.id).all()
+        )
+    )
+
+@main.route('/feedback_session/<request_id>/providers')
+@read_only
+@login_required
+def feedback_session_providers(request_id):
+    """Provider list fragment, refetched by realtime.js when a provider completes"""
+    feedback_request = FeedbackRequest.query.filter_by(request_id=request_id).first()
+    if not feedback_request or feedback_request.requestor_id != current_user.id_string:
+        return "Invalid request ID", 404
+    return _render_providers_fragment(feedback_request)
+
 @main.route('/feedback_session/<request_id>', methods=['GET', 'POST'])
+@rate_limit('feedback_session')
+@read_only
 def feedback_session(request_id):
     feedback_request = FeedbackRequest.query.filter_by(request_id=request_id).first()
     if not feedback_request:
         return "Invalid request ID", 404
-    # Continue with your logic
+
+    is_provider = not (current_user.is_authenticated and current_user.id_string == feedback_request.requestor_id)
+
+    providers_html = None if is_provider else _render_providers_fragment(feedback_request)
+
+    return render_template(
+        'feedback_session.html',
+        feedback_request=feedback_request,
+        is_provider=is_provider,
+        chat_enabled=feedback_request.status != 'completed',
+        providers_html=providers_html
+    )
+
+@main.route('/feedback/submit/<request_id>', methods=['POST'])
+@rate_limit('feedback_session')
+@idempotent
+def submit_feedback(request_id):
+    data = request.get_json(silent=True) or {}
+    feedback = (data.get('feedback') or '').strip()
+    if not feedback:
+        return jsonify({"status": "error", "message": "Feedback is required"}), 400
+
+    feedback_request = FeedbackRequest.query.filter_by(request_id=request_id).first()
+    if not feedback_request:
+        return jsonify({"status": "error", "message": "Invalid request ID"}), 404
+    if feedback_request.status == 'completed':
+        return jsonify({"status": "error", "message": "This feedback session has been completed"}), 409
+
+    # Invited providers are matched by access token, or by email when logged in
+    provider = verify_feedback_token(request.args.get('token'))
+    if provider is None and current_user.is_authenticated:
+        provider = FeedbackProvider.query.filter_by(
+            feedback_request_id=feedback_request.id,
+            provider_email=current_user.email
+        ).first()
+    if provider is None or provider.feedback_request_id != feedback_request.id:
+        return jsonify({"status": "error", "message": "Invalid access token"}), 403
+    if provider.status == 'completed':
+        return jsonify({"status": "error", "message": "Feedback has already been submitted"}), 409
+    provider_id = provider.id if provider else None
+    feedback_request_pk = feedback_request.id
+
+    # End the read transaction so the pooled connection isn't held during the LLM call
+    db.session.commit()
+    try:
+        analysis = analyze_feedback(feedback)
+    except RuntimeError as e:
+        logger.error(f"Feedback analysis failed, storing feedback without it: {str(e)}", extra={"request_id": request_id})
+        analysis = None
+
+    try:
+        content = {'feedback': feedback}
+        if analysis:
+            content['analysis'] = analysis
+        feedback_session = FeedbackSession(
+            feedback_request_id=feedback_request_pk,
+            provider_id=current_user.id_string if current_user.is_authenticated else None,
+            feedback_provider_id=provider_id,
+            content=content,
+            completed_at=datetime.utcnow()
+        )
+        db.session.add(feedback_session)
+        db.session.get(FeedbackProvider, provider_id).status = 'completed'
+        db.session.commit()
+        return jsonify({"status": "success", "session_id": feedback_session.id}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to submit feedback: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"status": "error", "message": "Failed to submit feedback"}), 500
+
+@main.route('/chat/message', methods=['POST'])
+@rate_limit('chat_message')
+def chat_message():
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip()
+    request_id = data.get('request_id')
+
+    if not message or not request_id:
+        return jsonify({"status": "error", "message": "Message and request ID are required"}), 400
+
+    max_chars = current_app.config.get('CHAT_MAX_MESSAGE_CHARS', 4000)
+    if len(message) > max_chars:
+        return jsonify({"status": "error", "message": f"Message is longer than {max_chars} characters"}), 400
+
+    feedback_request = FeedbackRequest.query.filter_by(request_id=request_id).first()
+    if not feedback_request:
+        return jsonify({"status": "error", "message": "Invalid request ID"}), 404
+
+    # Providers may not be logged in, so fall back to a per-browser participant id
+    if current_user.is_authenticated:
+        participant_id = current_user.id_string
+    else:
+        participant_id = session.setdefault('chat_participant_id', str(uuid.uuid4()))
+    conversation_key = f"{request_id}:{participant_id}"
+
+    try:
+        memory = conversation_store.load(conversation_key)
+        memory.add_turn('user', message)
+
+        context_summary = (feedback_request.ai_context or {}).get('summary', '')
+        system_prompt = (
+            f"You are an AI assistant guiding a feedback conversation about: {feedback_request.topic}. "
+            f"Context from the requestor: {context_summary} "
+            "Ask focused follow-up questions and help the user structure constructive feedback."
+        )
+        messages = memory.build_messages(system_prompt)
+        # End the read transaction so the pooled connection isn't held during the LLM call
+        db.session.commit()
+
+        result = respond_to_chat_message(messages)
+        if 'error' in result:
+            return jsonify({"status": "error", "message": result['error']}), 502
+
+        memory.add_turn('assistant', result['response'])
+        # Older turns are folded into the summary after replying, so the next prompt stays bounded
+        memory.compact(summarize_conversation)
+        conversation_store.save(conversation_key, memory)
+
+        return jsonify({"status": "success", "response": result['response']}), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to process chat message: {str(e)}", extra={"request_id": request_id})
+        return jsonify({"status": "error", "message": "Failed to process chat message"}), 500
+
+@main.route('/export')
+@read_only
+@login_required
+def export_feedback():
+    """Stream the user's feedback history as CSV or NDJSON, optionally gzipped"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    user_id = current_user.id_string
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 500)
+
+    def generate():
+        # The body is produced after the view returns, so pick the replica inside the generator
+        with use_replica():
+            yield from stream_export(user_id, fmt, compress=compress, batch_size=batch_size)
+
+    headers = {
+        'Content-Disposition': f'attachment; filename="{export_filename(fmt, compress)}"',
+        # Let the proxy pass chunks through instead of buffering the whole export
+        'X-Accel-Buffering': 'no',
+    }
+    mimetype = 'application/gzip' if compress else MIMETYPES[fmt]
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
+
+@main.route('/feedback/remind/<int:provider_id>', methods=['POST'])
+@login_required
+def remind_provider(provider_id):
+    """Send one invited provider a reminder; used by the dashboard's per-provider button"""
+    try:
+        provider = db.session.get(FeedbackProvider, provider_id)
+        feedback_request = provider.feedback_request if provider else None
+        if not feedback_request or feedback_request.requestor_id != current_user.id_string:
+            return jsonify({"status": "error", "message": "Invalid provider"}), 404
+        if provider.status != 'invited':
+            return jsonify({"status": "error", "message": "This provider has already responded"}), 409
+
+        # Addresses SendGrid reported as bounced, dropped or spam would only hurt sender reputation
+        if undeliverable_emails([provider.provider_email]):
+            return jsonify({
+                "status": "error",
+                "message": f"Emails to {provider.provider_email} are not being delivered"
+            }), 409
+
+        if not send_feedback_reminder_email(
+            recipient_email=provider.provider_email,
+            requestor_name=current_user.username,
+            feedback_url=url_for('main.feedback_session', request_id=feedback_request.request_id, _external=True),
+            request_id=feedback_request.request_id
+        ):
+            return jsonify({"status": "error", "message": "Failed to send reminder"}), 502
+        return jsonify({"status": "success", "message": "Reminder sent successfully"}), 200
+    except Exception as e:
+        logger.error(f"Failed to send reminder to provider {provider_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Failed to send reminder"}), 500
 
 @main.route('/send_reminder/<request_id>', methods=['POST'])
 @login_required
 def send_reminder(request_id):
     try:
         feedback_request = FeedbackRequest.query.filter_by(request_id=request_id).first()
-        if not feedback_request:
+        if not feedback_request or feedback_request.requestor_id != current_user.id_string:
             return jsonify({"error": "Invalid request ID"}), 404
-        
-        # Your existing code for sending reminder
-        # Example: send_reminder_email(feedback_request)
-        
-        return jsonify({"message": "Reminder sent successfully"}), 200
+
+        providers = FeedbackProvider.query.filter_by(feedback_request_id=feedback_request.id, status='invited').all()
+        # Addresses SendGrid reported as bounced, dropped or spam would only hurt sender reputation
+        skipped = undeliverable_emails(provider.provider_email for provider in providers)
+        feedback_url = url_for('main.feedback_session', request_id=request_id, _external=True)
+
+        sent = 0
+        for provider in providers:
+            if provider.provider_email.lower() in skipped:
+                continue
+            if send_feedback_reminder_email(
+                recipient_email=provider.provider_email,
+                requestor_name=current_user.username,
+                feedback_url=feedback_url,
+                request_id=request_id
+            ):
+                sent += 1
+
+        return jsonify({
+            "message": "Reminder sent successfully",
+            "sent": sent,
+            "skipped": sorted(skipped)
+        }), 200
     except Exception as e:
         logger.error(f"Failed to send reminder: {str(e)}", extra={"request_id": request_id})
         return jsonify({"error": "Failed to send reminder"}), 500
@@ -139,12 +139,12 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    // Add event listeners for reminder buttons
-    document.querySelectorAll('.send-reminder').forEach(button => {
-        button.addEventListener('click', function() {
-            const providerId = this.dataset.providerId;
-            sendReminder(providerId);
-        });
+    // Add event listeners for reminder buttons (delegated, the provider list is replaced in place)
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.send-reminder');
+        if (button) {
+            sendReminder(button.dataset.providerId);
+        }
     });
     
     // Reset form and error state when modal is closed
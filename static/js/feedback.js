@@ -1,6 +1,10 @@
 document.addEventListener('DOMContentLoaded', function() {
     const submitButton = document.getElementById('submitFeedback');
     
+    // Retries and double clicks of the same feedback reuse the key, so it is only processed once
+    let idempotencyKey = null;
+    let submittedBody = null;
+
     if (submitButton) {
         submitButton.addEventListener('click', async function() {
             const responses = Array.from(document.querySelectorAll('.feedback-response'))
@@ -14,16 +18,25 @@ document.addEventListener('DOMContentLoaded', function() {
             }).join('\n\n');
             
             const requestId = window.location.pathname.split('/').pop();
+            const body = JSON.stringify({ feedback: feedback });
+            if (body !== submittedBody) {
+                idempotencyKey = crypto.randomUUID();
+                submittedBody = body;
+            }
             
             try {
-                const response = await fetch(`/feedback/submit/${requestId}`, {
+                // The invitation link's access token identifies the provider
+                const token = new URLSearchParams(window.location.search).get('token');
+                const url = token
+                    ? `/feedback/submit/${requestId}?token=${encodeURIComponent(token)}`
+                    : `/feedback/submit/${requestId}`;
+                const response = await fetch(url, {
                     method: 'POST',
                     headers: {
-                        'Content-Type': 'application/json'
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': idempotencyKey
                     },
-                    body: JSON.stringify({
-                        feedback: feedback
-                    })
+                    body: body
                 });
                 
                 const data = await response.json();
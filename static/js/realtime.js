@@ -0,0 +1,60 @@
+// Live provider and request status updates over Socket.IO
+document.addEventListener('DOMContentLoaded', function() {
+    if (typeof io === 'undefined') {
+        return;
+    }
+
+    const providersPanel = document.getElementById('providersPanel');
+    const requestId = providersPanel ? providersPanel.dataset.realtimeRequest : null;
+    const socket = io();
+
+    socket.on('connect', function() {
+        // Re-subscribe after reconnects, rooms are not kept across connections
+        if (requestId) {
+            socket.emit('subscribe', { request_id: requestId });
+        }
+    });
+
+    // Small status delta: update the badge right away
+    socket.on('provider_status', function(data) {
+        const badge = document.querySelector(`[data-provider-status="${data.provider_id}"]`);
+        if (badge) {
+            badge.textContent = data.status.charAt(0).toUpperCase() + data.status.slice(1);
+            badge.classList.toggle('bg-success', data.status === 'completed');
+            badge.classList.toggle('bg-warning', data.status !== 'completed');
+        }
+        if (data.status === 'completed') {
+            refreshProviders();
+        }
+    });
+
+    socket.on('analysis_ready', function() {
+        refreshProviders();
+    });
+
+    socket.on('request_status', function(data) {
+        const status = document.querySelector(`[data-request-status="${data.request_id}"]`);
+        if (status) {
+            status.textContent = data.status;
+        }
+    });
+
+    // Pull the (server-side cached) provider list fragment instead of reloading the page
+    let refreshTimer = null;
+    function refreshProviders() {
+        if (!providersPanel) {
+            return;
+        }
+        clearTimeout(refreshTimer);
+        refreshTimer = setTimeout(async function() {
+            try {
+                const response = await fetch(`/feedback_session/${requestId}/providers`);
+                if (response.ok) {
+                    providersPanel.innerHTML = await response.text();
+                }
+            } catch (error) {
+                console.error('Error refreshing providers:', error);
+            }
+        }, 250);
+    }
+});
@@ -0,0 +1,153 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StructuredOutputError(ValueError):
+    """Raised when model output cannot be repaired into a schema-valid object"""
+
+
+def _string_list(min_items: int = 1) -> Dict:
+    return {"type": "array", "items": {"type": "string"}, "minItems": min_items}
+
+
+def _object(**properties) -> Dict:
+    # Strict schemas: every property required, nothing extra (required for OpenAI strict mode)
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+SCHEMAS = {
+    "conversation_summary": _object(summary={"type": "string"}),
+    "chat_response": _object(response={"type": "string"}),
+    "feedback_prompts": _object(
+        introduction={"type": "string"},
+        questions=_string_list(),
+        closing={"type": "string"},
+    ),
+    "feedback_analysis": _object(
+        themes=_string_list(),
+        action_items=_string_list(min_items=0),
+        summary={"type": "string"},
+    ),
+}
+
+# Models that accept response_format json_schema (structured outputs) or only json_object mode.
+# Matched by prefix, most specific first; anything else relies on the prompt plus local repair.
+_JSON_SCHEMA_MODELS = ("gpt-4o-mini", "gpt-4o", "gpt-4.1", "o1", "o3")
+_JSON_OBJECT_MODELS = ("gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo")
+
+
+def response_format_kwargs(model: str, schema_name: str) -> Dict:
+    """Return the response_format request argument the given model supports, if any"""
+    if model.startswith(_JSON_SCHEMA_MODELS):
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": schema_name, "schema": SCHEMAS[schema_name], "strict": True},
+            }
+        }
+    if model.startswith(_JSON_OBJECT_MODELS):
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _extract_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} block, closing it if the output was truncated"""
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    stack = []
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:index + 1]
+
+    # Truncated output: close any open string and brackets
+    return text[start:] + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Any:
+    """Parse JSON from model output, tolerating code fences, surrounding prose and trailing commas"""
+    if text is None:
+        raise StructuredOutputError("Empty model output")
+
+    candidates = [text.strip()]
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        candidates.append(fenced.group(1).strip())
+    extracted = _extract_object(fenced.group(1) if fenced else text)
+    if extracted:
+        candidates.append(extracted)
+
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA_RE.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+
+    raise StructuredOutputError("Model output is not valid JSON")
+
+
+def validate(data: Any, schema: Dict, path: str = "$") -> None:
+    """Validate data against the JSON Schema subset used in SCHEMAS"""
+    expected = schema.get("type")
+    if expected == "object":
+        if not isinstance(data, dict):
+            raise StructuredOutputError(f"{path} must be an object")
+        for key in schema.get("required", []):
+            if key not in data:
+                raise StructuredOutputError(f"{path}.{key} is required")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in data:
+                validate(data[key], subschema, f"{path}.{key}")
+    elif expected == "array":
+        if not isinstance(data, list):
+            raise StructuredOutputError(f"{path} must be an array")
+        if len(data) < schema.get("minItems", 0):
+            raise StructuredOutputError(f"{path} must have at least {schema['minItems']} items")
+        for index, item in enumerate(data):
+            validate(item, schema.get("items", {}), f"{path}[{index}]")
+    elif expected == "string":
+        if not isinstance(data, str):
+            raise StructuredOutputError(f"{path} must be a string")
+
+
+def parse_structured_output(text: str, schema_name: str) -> Dict:
+    """Repair, validate and return model output for the named schema.
+
+    Unknown keys are dropped so callers always get exactly the documented structure.
+    """
+    schema = SCHEMAS[schema_name]
+    data = repair_json(text)
+    validate(data, schema)
+    return {key: data[key] for key in schema["properties"]}
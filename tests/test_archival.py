@@ -0,0 +1,137 @@
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from flask import Flask
+from sqlalchemy import event, text
+
+os.environ.setdefault('LLM_BACKEND', 'fake')
+
+from extensions import db
+from models import FeedbackProvider, FeedbackRequest, FeedbackSession, FeedbackSessionArchive, User
+import archival
+from archival import archive_sessions, compress_content, decompress_content
+from fragment_cache import fragment_cache
+from routes import _render_providers_fragment
+
+class TestArchival(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id_string='u1', username='user', email='user@example.com'))
+        feedback_request = FeedbackRequest(request_id='r1', topic='Topic', requestor_id='u1')
+        db.session.add(feedback_request)
+        db.session.flush()
+
+        old = datetime.utcnow() - timedelta(days=365)
+        self.old_ids = []
+        for i in range(5):
+            session = FeedbackSession(feedback_request_id=feedback_request.id, completed_at=old,
+                                      content={'answers': ['x' * 200], 'index': i})
+            db.session.add(session)
+            db.session.flush()
+            self.old_ids.append(session.id)
+        self.recent = FeedbackSession(feedback_request_id=feedback_request.id,
+                                      completed_at=datetime.utcnow(), content={'answers': ['recent']})
+        self.incomplete = FeedbackSession(feedback_request_id=feedback_request.id, content={'answers': []})
+        db.session.add_all([self.recent, self.incomplete])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def raw_content(self, session_id):
+        return db.session.execute(
+            text("SELECT content FROM feedback_session WHERE id = :id"), {'id': session_id}
+        ).scalar()
+
+    def test_archives_old_completed_sessions(self):
+        """Test that old sessions become stubs while content still reads back"""
+        totals = archive_sessions(older_than_days=180, batch_size=2)
+
+        self.assertEqual(totals['sessions'], 5)
+        self.assertEqual(totals['batches'], 3)
+        self.assertEqual(FeedbackSessionArchive.query.count(), 5)
+        self.assertIsNone(self.raw_content(self.old_ids[0]))
+
+        db.session.expire_all()
+        session = db.session.get(FeedbackSession, self.old_ids[3])
+        self.assertIsNotNone(session.archived_at)
+        self.assertEqual(session.content['index'], 3)
+
+    def test_recent_and_incomplete_sessions_untouched(self):
+        archive_sessions(older_than_days=180)
+        self.assertIsNone(self.recent.archived_at)
+        self.assertIsNone(self.incomplete.archived_at)
+        self.assertIsNotNone(self.raw_content(self.recent.id))
+
+    def test_rerun_is_idempotent(self):
+        archive_sessions(older_than_days=180)
+        totals = archive_sessions(older_than_days=180)
+        self.assertEqual(totals['sessions'], 0)
+        self.assertEqual(FeedbackSessionArchive.query.count(), 5)
+
+    def test_max_batches_stops_early(self):
+        """Test that a bounded run archives only the requested batches and resumes later"""
+        totals = archive_sessions(older_than_days=180, batch_size=2, max_batches=1)
+        self.assertEqual(totals['sessions'], 2)
+
+        totals = archive_sessions(older_than_days=180, batch_size=2)
+        self.assertEqual(totals['sessions'], 3)
+
+    def test_writing_content_unarchives(self):
+        archive_sessions(older_than_days=180)
+        db.session.expire_all()
+        session = db.session.get(FeedbackSession, self.old_ids[0])
+        session.content = {'answers': ['edited']}
+        db.session.commit()
+
+        self.assertIsNone(session.archived_at)
+        self.assertIsNone(db.session.get(FeedbackSessionArchive, self.old_ids[0]))
+        self.assertIsNotNone(self.raw_content(self.old_ids[0]))
+
+    def test_providers_fragment_loads_archives_in_one_query(self):
+        """Test that rendering archived feedback doesn't lazy-load each archive row"""
+        feedback_request = FeedbackRequest.query.one()
+        for i, session_id in enumerate(self.old_ids):
+            provider = FeedbackProvider(feedback_request_id=feedback_request.id,
+                                        provider_email=f'p{i}@example.com', status='completed')
+            db.session.add(provider)
+            db.session.flush()
+            session = db.session.get(FeedbackSession, session_id)
+            session.feedback_provider_id = provider.id
+            session.content = {'feedback': f'archived feedback {i}'}
+        db.session.commit()
+        archive_sessions(older_than_days=180)
+        db.session.expire_all()
+        feedback_request = FeedbackRequest.query.one()
+
+        self.app.template_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+        statements = []
+        record = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', record)
+        with patch.object(fragment_cache, 'enabled', False), self.app.test_request_context():
+            html = str(_render_providers_fragment(feedback_request))
+
+        self.assertIn('archived feedback 4', html)
+        self.assertEqual(len(statements), 2)
+
+    def test_zlib_fallback_round_trip(self):
+        """Test that content compresses and restores without zstandard installed"""
+        content = {'answers': ['é' * 100], 'score': 4}
+        with patch.object(archival, 'zstandard', None):
+            codec, payload, original_size = compress_content(content)
+        self.assertEqual(codec, 'zlib')
+        self.assertLess(len(payload), original_size)
+        self.assertEqual(decompress_content(codec, payload), content)
+
+if __name__ == '__main__':
+    unittest.main()
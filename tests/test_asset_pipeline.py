@@ -0,0 +1,75 @@
+import gzip
+import os
+import tempfile
+import unittest
+from flask import Flask, render_template_string
+from asset_pipeline import IMMUTABLE_CACHE_CONTROL, build_assets, init_assets, manifest_is_current
+
+class TestAssetPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        static = os.path.join(self.tmpdir.name, "static")
+        os.makedirs(os.path.join(static, "js"))
+        with open(os.path.join(static, "js", "app.js"), "w") as f:
+            f.write("console.log('hello');\n" * 50)
+
+        self.app = Flask(__name__, static_folder=static)
+        init_assets(self.app)
+        self.client = self.app.test_client()
+
+    def asset_url(self):
+        with self.app.test_request_context():
+            return render_template_string("{{ url_for('static', filename='js/app.js') }}")
+
+    def test_url_for_is_fingerprinted(self):
+        """Test that url_for('static') points at the fingerprinted build"""
+        url = self.asset_url()
+        self.assertRegex(url, r"^/assets/js/app\.[0-9a-f]{16}\.js$")
+
+    def test_unknown_static_file_falls_back(self):
+        """Test that files outside the manifest keep the default static URL"""
+        with self.app.test_request_context():
+            url = render_template_string("{{ url_for('static', filename='img/logo.png') }}")
+        self.assertEqual(url, "/static/img/logo.png")
+
+    def test_serves_gzip_with_immutable_caching(self):
+        """Test precompressed delivery and far-future cache headers"""
+        response = self.client.get(self.asset_url(), headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        self.assertIn("hello", gzip.decompress(response.data).decode())
+
+    def test_serves_identity_without_accept_encoding(self):
+        response = self.client.get(self.asset_url(), headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn(b"hello", response.data)
+
+    def test_conditional_request_returns_304(self):
+        """Test that a matching strong ETag returns 304 without a body"""
+        url = self.asset_url()
+        etag = self.client.get(url, headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+    def test_unknown_asset_404(self):
+        self.assertEqual(self.client.get("/assets/js/app.deadbeef.js").status_code, 404)
+
+    def test_manifest_goes_stale_when_source_changes(self):
+        """Test that editing a source asset invalidates the manifest"""
+        static = self.app.static_folder
+        build = self.app.config["ASSET_BUILD_FOLDER"]
+        manifest = build_assets(static, build)
+        self.assertTrue(manifest_is_current(static, build, manifest))
+
+        with open(os.path.join(static, "js", "app.js"), "a") as f:
+            f.write("// changed\n")
+        self.assertFalse(manifest_is_current(static, build, manifest))
+
+if __name__ == '__main__':
+    unittest.main()
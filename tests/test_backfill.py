@@ -0,0 +1,114 @@
+import unittest
+from flask import Flask
+from extensions import db
+from models import BackfillCheckpoint, FeedbackRequest, User
+from backfill import Backfill, FeedbackRequestIdBackfill, Progress, backfill_cli, run_backfill
+
+class StatusBackfill(Backfill):
+    name = "test_status"
+    model = FeedbackRequest
+
+    def __init__(self):
+        self.batches = []
+
+    def pending(self):
+        return FeedbackRequest.status.is_(None)
+
+    def apply(self, rows):
+        self.batches.append([row.id for row in rows])
+        for row in rows:
+            row.status = 'pending'
+        return len(rows)
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.app.cli.add_command(backfill_cli)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id_string='u1', username='user', email='user@example.com'))
+        for i in range(10):
+            db.session.add(FeedbackRequest(request_id=f'r{i}', topic='Topic', requestor_id='u1', status='completed'))
+        db.session.commit()
+        # Odd ids predate the column default
+        FeedbackRequest.query.filter(FeedbackRequest.id % 2 == 1).update({'status': None})
+        db.session.commit()
+        self.backfill = StatusBackfill()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_updates_only_pending_rows_in_ranges(self):
+        """Test that every pending row is fixed in id-range batches"""
+        checkpoint = run_backfill(self.backfill, batch_size=3)
+
+        self.assertEqual(checkpoint.status, 'completed')
+        self.assertEqual(checkpoint.rows_updated, 5)
+        self.assertEqual(checkpoint.last_id, 10)
+        self.assertEqual(self.backfill.batches, [[1, 3], [5], [7, 9]])
+        self.assertEqual(FeedbackRequest.query.filter_by(status='completed').count(), 5)
+        self.assertEqual(FeedbackRequest.query.filter(FeedbackRequest.status.is_(None)).count(), 0)
+
+    def test_resumes_from_checkpoint(self):
+        """Test that a bounded run stops and the next run continues after the last range"""
+        checkpoint = run_backfill(self.backfill, batch_size=4, max_batches=1)
+        self.assertEqual(checkpoint.status, 'running')
+        self.assertEqual(checkpoint.last_id, 4)
+
+        checkpoint = run_backfill(self.backfill, batch_size=4)
+        self.assertEqual(checkpoint.status, 'completed')
+        self.assertEqual(self.backfill.batches, [[1, 3], [5, 7], [9]])
+        self.assertEqual(checkpoint.rows_updated, 5)
+
+    def test_completed_backfill_is_not_rerun(self):
+        run_backfill(self.backfill)
+        run_backfill(self.backfill)
+        self.assertEqual(len(self.backfill.batches), 1)
+
+    def test_restart_is_idempotent(self):
+        """Test that restarting finds nothing left to change"""
+        run_backfill(self.backfill)
+        checkpoint = run_backfill(self.backfill, restart=True)
+        self.assertEqual(checkpoint.rows_updated, 0)
+        self.assertEqual(db.session.get(BackfillCheckpoint, 'test_status').status, 'completed')
+
+    def test_request_id_backfill_assigns_unique_ids(self):
+        rows = [FeedbackRequest(topic='Topic', requestor_id='u1') for _ in range(3)]
+        self.assertEqual(FeedbackRequestIdBackfill().apply(rows), 3)
+        self.assertEqual(len({row.request_id for row in rows}), 3)
+
+    def test_incomplete_backfill_fails_on_instantiation(self):
+        class MissingApply(Backfill):
+            name = 'missing_apply'
+
+            def pending(self):
+                return None
+
+        with self.assertRaises(TypeError):
+            MissingApply()
+
+    def test_cli_lists_and_rejects_unknown(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['backfill', 'list'])
+        self.assertIn('feedback_request_request_id [not started]', result.output)
+        result = runner.invoke(args=['backfill', 'run', 'nope'])
+        self.assertNotEqual(result.exit_code, 0)
+
+class TestProgress(unittest.TestCase):
+    def test_rate_and_eta(self):
+        now = [0.0]
+        progress = Progress(total=100, clock=lambda: now[0])
+        now[0] = 10.0
+        progress.advance(25)
+        self.assertEqual(progress.rate, 2.5)
+        self.assertEqual(progress.eta, 30.0)
+        self.assertIn('25/100 (25.0%)', progress.format())
+
+if __name__ == '__main__':
+    unittest.main()
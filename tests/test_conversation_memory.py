@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import MagicMock
+from conversation_memory import ConversationMemory, estimate_tokens
+
+class TestConversationMemory(unittest.TestCase):
+    def setUp(self):
+        self.memory = ConversationMemory(max_turns=4, token_budget=200, summary_token_budget=50)
+
+    def test_compact_keeps_recent_turns_verbatim(self):
+        """Test that compaction folds turns down to half the limit, keeping the latest verbatim"""
+        for i in range(6):
+            self.memory.add_turn('user' if i % 2 == 0 else 'assistant', f"message {i}")
+        summarizer = MagicMock(return_value="summary of 0 to 3")
+
+        self.assertTrue(self.memory.compact(summarizer))
+        self.assertEqual([content for _, content in self.memory.turns], ["message 4", "message 5"])
+        self.assertEqual(self.memory.summary, "summary of 0 to 3")
+        summarizer.assert_called_once_with("", [
+            {"role": "user", "content": "message 0"},
+            {"role": "assistant", "content": "message 1"},
+            {"role": "user", "content": "message 2"},
+            {"role": "assistant", "content": "message 3"},
+        ])
+
+    def test_summarizes_every_few_exchanges(self):
+        """Test that the summarizer isn't called on every turn once past the limit"""
+        memory = ConversationMemory(max_turns=6, token_budget=1500)
+        summarizer = MagicMock(return_value="summary")
+        for i in range(12):
+            memory.add_turn('user', f"question {i}")
+            memory.add_turn('assistant', f"answer {i}")
+            memory.compact(summarizer)
+        # Compacting to 2 turns leaves room for two more exchanges; trimming to the limit would call it 9 times
+        self.assertEqual(summarizer.call_count, 3)
+
+    def test_compact_enforces_token_budget(self):
+        """Test that long turns are summarized even below the turn limit"""
+        self.memory.add_turn('user', "x" * 800)
+        self.memory.add_turn('assistant', "short answer")
+        self.memory.add_turn('user', "short question")
+
+        self.memory.compact(lambda summary, turns: "long turn summarized")
+        self.assertEqual(len(self.memory.turns), 2)
+        self.assertLessEqual(self.memory.token_count(), self.memory.token_budget)
+
+    def test_compact_noop_within_budget(self):
+        """Test that compaction does not call the summarizer when nothing is evicted"""
+        self.memory.add_turn('user', "hello")
+        summarizer = MagicMock()
+
+        self.assertFalse(self.memory.compact(summarizer))
+        summarizer.assert_not_called()
+
+    def test_summarizer_failure_keeps_evicted_content(self):
+        """Test that a failing summarizer does not drop conversation content"""
+        for i in range(6):
+            self.memory.add_turn('user', f"message {i}")
+
+        self.memory.compact(MagicMock(side_effect=RuntimeError("API down")))
+        self.assertIn("message 0", self.memory.summary)
+        self.assertLessEqual(estimate_tokens(self.memory.summary), self.memory.summary_token_budget + 1)
+
+    def test_prompt_size_stays_bounded(self):
+        """Test that the built prompt does not grow with conversation length"""
+        sizes = []
+        for i in range(50):
+            self.memory.add_turn('user', f"question number {i} " * 5)
+            self.memory.add_turn('assistant', f"answer number {i} " * 5)
+            self.memory.compact(lambda summary, turns: (summary + " more")[-150:])
+            sizes.append(sum(len(m['content']) for m in self.memory.build_messages("system")))
+        self.assertLessEqual(max(sizes[10:]), max(sizes[:10]) + 200)
+
+    def test_state_round_trip(self):
+        """Test compact serialization and restoration"""
+        self.memory.summary = "earlier context"
+        self.memory.add_turn('user', "hi")
+        self.memory.add_turn('assistant', "hello")
+
+        restored = ConversationMemory.from_state(self.memory.to_state(), max_turns=4)
+        self.assertEqual(restored.summary, "earlier context")
+        self.assertEqual(restored.turns, [('user', "hi"), ('assistant', "hello")])
+        self.assertNotIn('"role"', self.memory.to_state())
+
+    def test_unreadable_state_starts_fresh(self):
+        """Test that corrupt stored state is discarded"""
+        with self.assertLogs(level='ERROR'):
+            memory = ConversationMemory.from_state("{not json")
+        self.assertEqual(memory.turns, [])
+
+if __name__ == '__main__':
+    unittest.main()
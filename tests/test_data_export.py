@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from datetime import datetime, timedelta
+from flask import Flask
+from extensions import db
+from models import FeedbackProvider, FeedbackRequest, FeedbackSession, User
+from archival import archive_sessions
+from data_export import FIELDS, export_cli, stream_export
+
+class TestDataExport(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.app.cli.add_command(export_cli)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id_string='u1', username='user', email='user@example.com'))
+        db.session.add(User(id_string='u2', username='other', email='other@example.com'))
+        mine = FeedbackRequest(request_id='r1', topic='Q3 review', requestor_id='u1', ai_context={'summary': 's'})
+        theirs = FeedbackRequest(request_id='r2', topic='Private', requestor_id='u2')
+        db.session.add_all([mine, theirs])
+        db.session.flush()
+
+        provider = FeedbackProvider(feedback_request_id=mine.id, provider_email='p@example.com', status='completed')
+        db.session.add(provider)
+        db.session.flush()
+        old = datetime.utcnow() - timedelta(days=365)
+        db.session.add_all([
+            FeedbackSession(feedback_request_id=mine.id, feedback_provider_id=provider.id, completed_at=old,
+                            content={'answers': ['Good, "clear" work'], 'analysis': {'score': 4}}),
+            FeedbackSession(feedback_request_id=mine.id, content={'answers': ['second']}),
+            FeedbackSession(feedback_request_id=theirs.id, content={'answers': ['not mine']}),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def ndjson_records(self, **kwargs):
+        data = b"".join(stream_export('u1', 'ndjson', **kwargs))
+        return [json.loads(line) for line in data.decode().splitlines()]
+
+    def test_ndjson_contains_only_users_records(self):
+        """Test that requests and sessions are exported and other users' data is not"""
+        records = self.ndjson_records(batch_size=1)
+        self.assertEqual([r['record_type'] for r in records], ['request', 'session', 'session'])
+        self.assertTrue(all(r['request_id'] == 'r1' for r in records))
+        self.assertEqual(records[1]['analysis'], {'score': 4})
+        self.assertEqual(records[1]['content'], {'answers': ['Good, "clear" work']})
+        self.assertEqual(records[1]['provider_email'], 'p@example.com')
+
+    def test_archived_content_is_exported(self):
+        archive_sessions(older_than_days=180)
+        records = self.ndjson_records()
+        self.assertEqual(records[1]['analysis'], {'score': 4})
+
+    def test_csv_round_trip(self):
+        data = b"".join(stream_export('u1', 'csv')).decode()
+        rows = list(csv.DictReader(io.StringIO(data)))
+        self.assertEqual(tuple(rows[0].keys()), FIELDS)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(json.loads(rows[1]['content']), {'answers': ['Good, "clear" work']})
+
+    def test_gzip_stream_decompresses(self):
+        plain = b"".join(stream_export('u1', 'ndjson'))
+        compressed = b"".join(stream_export('u1', 'ndjson', compress=True))
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_empty_csv_has_header(self):
+        data = b"".join(stream_export('nobody', 'csv')).decode()
+        self.assertEqual(data.strip(), ",".join(FIELDS))
+
+    def test_unknown_format_rejected(self):
+        with self.assertRaises(ValueError):
+            stream_export('u1', 'xml')
+
+    def test_cli_exports_by_email(self):
+        result = self.app.test_cli_runner().invoke(args=['export', 'user', 'user@example.com', '--format', 'ndjson'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(len(result.output.splitlines()), 3)
+
+if __name__ == '__main__':
+    unittest.main()
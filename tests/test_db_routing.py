@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+from flask import Flask, jsonify
+from sqlalchemy.exc import OperationalError
+from extensions import db
+from models import User
+from db_routing import ReplicaRouter, read_only, use_primary, use_replica
+
+class TestReplicaRouting(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'primary.db')
+        self.app.config['SQLALCHEMY_BINDS'] = {'replica_0': 'sqlite:///' + os.path.join(self.tmpdir.name, 'replica.db')}
+        self.app.config['REPLICA_BINDS'] = ['replica_0']
+        db.init_app(self.app)
+
+        self.now = [0.0]
+        self.lag = [0.0]
+        self.router = ReplicaRouter(lag_probe=self.probe, clock=lambda: self.now[0])
+        self.router.init_app(self.app)
+
+        # The replica holds a different row so tests can tell where a read went
+        with self.app.app_context():
+            db.create_all()
+            db.metadata.create_all(db.engines['replica_0'])
+            db.session.add(User(id_string='u1', username='primary', email='u1@example.com'))
+            db.session.commit()
+            with db.engines['replica_0'].begin() as conn:
+                conn.execute(User.__table__.insert().values(id_string='u1', username='replica', email='u1@example.com'))
+
+        @self.app.route('/profile', methods=['GET', 'POST'])
+        @read_only
+        def profile():
+            return jsonify(username=db.session.get(User, 'u1').username)
+
+        @self.app.route('/rename', methods=['POST'])
+        def rename():
+            db.session.get(User, 'u1').name = 'Renamed'
+            db.session.commit()
+            return jsonify(ok=True)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            for engine in db.engines.values():
+                engine.dispose()
+        # init_app registers a metadata per bind on the shared db; later test apps don't have this bind
+        db.metadatas.pop('replica_0', None)
+
+    def probe(self, engine):
+        if self.lag[0] is None:
+            raise OperationalError('SELECT 1', {}, Exception('down'))
+        return self.lag[0]
+
+    def read_username(self):
+        with self.app.app_context():
+            return db.session.get(User, 'u1').username
+
+    def test_reads_default_to_primary(self):
+        self.assertEqual(self.read_username(), 'primary')
+
+    def test_use_replica_routes_selects(self):
+        """Test that reads inside use_replica go to the replica bind"""
+        with self.app.app_context():
+            with use_replica():
+                self.assertEqual(db.session.get(User, 'u1').username, 'replica')
+                db.session.expire_all()
+                with use_primary():
+                    self.assertEqual(db.session.get(User, 'u1').username, 'primary')
+        self.assertEqual(self.router.replica_reads, 1)
+
+    def test_writes_go_to_primary_and_later_reads_follow(self):
+        """Test that flushes use the primary and the rest of the transaction reads from it"""
+        with self.app.app_context():
+            with use_replica():
+                db.session.add(User(id_string='u2', username='new', email='u2@example.com'))
+                db.session.flush()
+                self.assertEqual(db.session.get(User, 'u1').username, 'primary')
+                db.session.commit()
+        with self.app.app_context():
+            self.assertIsNotNone(db.session.get(User, 'u2'))
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        self.lag[0] = 30.0
+        self.assertEqual(self.client.get('/profile').json['username'], 'primary')
+        self.assertEqual(self.router.primary_fallbacks, 1)
+
+    def test_unreachable_replica_falls_back_until_next_probe(self):
+        """Test that a failed probe is cached and retried after the check interval"""
+        self.lag[0] = None
+        self.assertEqual(self.client.get('/profile').json['username'], 'primary')
+        self.lag[0] = 0.0
+        self.assertEqual(self.client.get('/profile').json['username'], 'primary')
+        self.now[0] += self.router.check_interval
+        self.assertEqual(self.client.get('/profile').json['username'], 'replica')
+
+    def test_replica_pinned_per_transaction(self):
+        """Test that one transaction keeps reading from the replica it started on"""
+        with self.app.app_context():
+            with use_replica():
+                self.assertEqual(db.session.get(User, 'u1').username, 'replica')
+                # A lag spike mid-transaction must not send later reads elsewhere
+                self.lag[0] = 60
+                self.now[0] = 10
+                db.session.expire_all()
+                self.assertEqual(db.session.get(User, 'u1').username, 'replica')
+                self.assertEqual(self.router.replica_reads, 1)
+
+                db.session.commit()
+                db.session.expire_all()
+                self.assertEqual(db.session.get(User, 'u1').username, 'primary')
+
+    def test_read_only_routes_only_get(self):
+        self.assertEqual(self.client.get('/profile').json['username'], 'replica')
+        self.assertEqual(self.client.post('/profile').json['username'], 'primary')
+
+    def test_read_your_writes_after_commit(self):
+        """Test that a client reads from the primary for a while after its own commit"""
+        other = self.app.test_client()
+        self.client.post('/rename')
+        self.assertEqual(self.client.get('/profile').json['username'], 'primary')
+        self.assertEqual(other.get('/profile').json['username'], 'replica')
+
+        with self.client.session_transaction() as session:
+            session['_db_primary_until'] = 0
+        self.assertEqual(self.client.get('/profile').json['username'], 'replica')
+
+    def test_no_replicas_configured(self):
+        self.router.binds = []
+        self.assertEqual(self.client.get('/profile').json['username'], 'primary')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import base64
+import json
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from flask import Flask
+from flask_login import LoginManager
+
+os.environ.setdefault('LLM_BACKEND', 'fake')
+
+from extensions import db
+from models import EmailDeliveryStatus, FeedbackProvider, FeedbackRequest, User
+from email_events import coalesce_events, email_events_bp, undeliverable_emails, upsert_delivery_statuses
+from routes import main
+
+def event(name, message='msg1', timestamp=1700000000, email='Provider@example.com', **extra):
+    return {'event': name, 'sg_message_id': f'{message}.filter0001.1.0', 'timestamp': timestamp,
+            'email': email, 'request_id': 'r1', **extra}
+
+class TestEmailEvents(unittest.TestCase):
+    def setUp(self):
+        self.private_key = ec.generate_private_key(ec.SECP256R1())
+        der = self.private_key.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SENDGRID_WEBHOOK_PUBLIC_KEY'] = base64.b64encode(der).decode()
+        db.init_app(self.app)
+        self.app.register_blueprint(email_events_bp)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def post(self, events, signature=None):
+        payload = json.dumps(events)
+        timestamp = '1700000100'
+        if signature is None:
+            signature = base64.b64encode(self.private_key.sign(
+                (timestamp + payload).encode(), ec.ECDSA(hashes.SHA256()))).decode()
+        return self.client.post('/webhooks/sendgrid/events', data=payload, content_type='application/json', headers={
+            'X-Twilio-Email-Event-Webhook-Signature': signature,
+            'X-Twilio-Email-Event-Webhook-Timestamp': timestamp,
+        })
+
+    def test_signed_batch_is_coalesced_and_stored(self):
+        """Test that a batch of events becomes one row per message and request"""
+        response = self.post([event('processed'), event('delivered', timestamp=1700000005),
+                              event('open', timestamp=1700000050), event('delivered', message='msg2')])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'events': 4, 'rows': 2})
+
+        row = db.session.get(EmailDeliveryStatus, ('msg1', 'r1'))
+        self.assertEqual(row.status, 'open')
+        self.assertEqual(row.event_count, 3)
+        self.assertEqual(row.email, 'provider@example.com')
+        self.assertIsNotNone(row.delivered_at)
+        self.assertIsNotNone(row.opened_at)
+
+    def test_invalid_signature_rejected(self):
+        self.assertEqual(self.post([event('delivered')], signature='bm90IGEgc2ln').status_code, 403)
+        self.assertEqual(self.post([event('delivered')], signature='***').status_code, 403)
+        self.assertEqual(EmailDeliveryStatus.query.count(), 0)
+
+    def test_missing_public_key_rejects(self):
+        self.app.config['SENDGRID_WEBHOOK_PUBLIC_KEY'] = None
+        self.assertEqual(self.post([event('delivered')]).status_code, 403)
+
+    def test_upsert_keeps_terminal_status(self):
+        """Test that later batches merge counts and never downgrade a bounce"""
+        upsert_delivery_statuses(coalesce_events([event('bounce', reason='550 mailbox unavailable')]))
+        upsert_delivery_statuses(coalesce_events([event('deferred', timestamp=1700000100)]))
+
+        db.session.expire_all()
+        row = db.session.get(EmailDeliveryStatus, ('msg1', 'r1'))
+        self.assertEqual(row.status, 'bounce')
+        self.assertEqual(row.reason, '550 mailbox unavailable')
+        self.assertEqual(row.event_count, 2)
+        self.assertEqual(row.last_event_at, datetime.utcfromtimestamp(1700000100))
+
+    def test_unknown_and_malformed_events_ignored(self):
+        rows = coalesce_events([{'event': 'mystery', 'sg_message_id': 'x'}, {'event': 'delivered'}, 'junk'])
+        self.assertEqual(rows, [])
+
+    def test_undeliverable_emails_uses_latest_message(self):
+        """Test that bounced addresses are reported until a later message gets through"""
+        upsert_delivery_statuses(coalesce_events([
+            event('bounce', message='a', email='gone@example.com'),
+            event('delivered', message='b', email='ok@example.com'),
+            event('bounce', message='c', email='back@example.com', timestamp=1700000000),
+            event('delivered', message='d', email='back@example.com', timestamp=1700009999),
+        ]))
+        self.assertEqual(undeliverable_emails(['Gone@example.com', 'ok@example.com', 'back@example.com']),
+                         {'gone@example.com'})
+
+class TestReminderRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SECRET_KEY'] = 'test'
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: db.session.get(User, user_id))
+        self.app.register_blueprint(main)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([User(id_string='u1', username='owner', email='owner@example.com'),
+                            User(id_string='u2', username='other', email='other@example.com')])
+        feedback_request = FeedbackRequest(request_id='r1', topic='Topic', requestor_id='u1')
+        db.session.add(feedback_request)
+        db.session.flush()
+        self.good = FeedbackProvider(feedback_request_id=feedback_request.id, provider_email='good@example.com')
+        self.gone = FeedbackProvider(feedback_request_id=feedback_request.id, provider_email='Gone@example.com')
+        db.session.add_all([self.good, self.gone])
+        db.session.commit()
+        upsert_delivery_statuses(coalesce_events([event('bounce', email='gone@example.com')]))
+
+        self.client = self.app.test_client()
+        self.login('u1')
+        patcher = patch('routes.send_feedback_reminder_email', return_value=True)
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def login(self, user_id):
+        with self.client.session_transaction() as session:
+            session['_user_id'] = user_id
+
+    def test_reminds_deliverable_provider(self):
+        """Test that the dashboard's per-provider reminder sends one email"""
+        response = self.client.post(f'/feedback/remind/{self.good.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['status'], 'success')
+        self.send.assert_called_once()
+        self.assertEqual(self.send.call_args.kwargs['recipient_email'], 'good@example.com')
+        self.assertEqual(self.send.call_args.kwargs['request_id'], 'r1')
+
+    def test_skips_bounced_provider(self):
+        response = self.client.post(f'/feedback/remind/{self.gone.id}')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json['status'], 'error')
+        self.send.assert_not_called()
+
+    def test_only_requestor_can_remind(self):
+        self.login('u2')
+        self.assertEqual(self.client.post(f'/feedback/remind/{self.good.id}').status_code, 404)
+        self.assertEqual(self.client.post('/feedback/remind/999').status_code, 404)
+        self.send.assert_not_called()
+
+    def test_bulk_reminder_skips_bounced(self):
+        response = self.client.post('/send_reminder/r1')
+        self.assertEqual(response.json['sent'], 1)
+        self.assertEqual(response.json['skipped'], ['gone@example.com'])
+
+if __name__ == '__main__':
+    unittest.main()
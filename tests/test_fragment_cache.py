@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import MagicMock
+from flask import Flask
+from extensions import db
+from models import FeedbackProvider, FeedbackRequest, FeedbackSession, FeedbackSessionArchive, User
+from fragment_cache import FragmentCache, LRUStore
+
+class TestLRUStore(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        store = LRUStore(max_entries=2)
+        store.set("a", "1")
+        store.set("b", "2")
+        store.get("a")
+        store.set("c", "3")
+        self.assertEqual(store.get("a"), "1")
+        self.assertIsNone(store.get("b"))
+
+    def test_entries_expire_after_ttl(self):
+        now = [0.0]
+        store = LRUStore(ttl=30, clock=lambda: now[0])
+        store.set("a", "1")
+        now[0] = 29
+        self.assertEqual(store.get("a"), "1")
+        now[0] = 30
+        self.assertIsNone(store.get("a"))
+
+class TestFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.cache = FragmentCache()
+        self.cache.init_app(self.app)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id_string='u1', username='user', email='user@example.com'))
+        self.feedback_request = FeedbackRequest(request_id='r1', topic='Topic', requestor_id='u1')
+        db.session.add(self.feedback_request)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_hit_skips_render(self):
+        """Test that an unchanged scope is served without rendering"""
+        render = MagicMock(return_value="<li>x</li>")
+        first = self.cache.get_or_render('list', ('user', 'u1'), render)
+        second = self.cache.get_or_render('list', ('user', 'u1'), render)
+
+        self.assertEqual(first, second)
+        render.assert_called_once()
+
+    def test_commit_invalidates_affected_scopes(self):
+        """Test that committing a session row bumps its request scope"""
+        request_scope = ('request', self.feedback_request.id)
+        version = self.cache.version(request_scope)
+        user_version = self.cache.version(('user', 'u1'))
+
+        db.session.add(FeedbackSession(feedback_request_id=self.feedback_request.id, content={}))
+        db.session.commit()
+
+        self.assertEqual(self.cache.version(request_scope), version + 1)
+        self.assertEqual(self.cache.version(('user', 'u1')), user_version)
+
+    def test_provider_write_invalidates_pending_list(self):
+        """Test that provider rows bump the invitee's email scope"""
+        version = self.cache.version(('email', 'invitee@example.com'))
+        db.session.add(FeedbackProvider(feedback_request_id=self.feedback_request.id,
+                                        provider_email='Invitee@example.com'))
+        db.session.commit()
+        self.assertEqual(self.cache.version(('email', 'invitee@example.com')), version + 1)
+
+    def test_request_edit_invalidates_invitee_pending_lists(self):
+        """Test that renaming a request bumps the email scope of every invitee"""
+        db.session.add(FeedbackProvider(feedback_request_id=self.feedback_request.id,
+                                        provider_email='Invitee@example.com'))
+        db.session.commit()
+        version = self.cache.version(('email', 'invitee@example.com'))
+
+        self.feedback_request.topic = 'Renamed'
+        db.session.commit()
+        self.assertEqual(self.cache.version(('email', 'invitee@example.com')), version + 1)
+
+    def test_archive_write_invalidates_request_scope(self):
+        """Test that rewriting an archived payload bumps the owning request's scope"""
+        session = FeedbackSession(feedback_request_id=self.feedback_request.id, content={})
+        db.session.add(session)
+        db.session.flush()
+        db.session.add(FeedbackSessionArchive(session_id=session.id, codec='none', payload=b'{}'))
+        db.session.commit()
+        scope = ('request', self.feedback_request.id)
+        version = self.cache.version(scope)
+
+        archive = db.session.get(FeedbackSessionArchive, session.id)
+        db.session.expunge(session)
+        archive.payload = b'{"feedback": "x"}'
+        db.session.commit()
+
+        self.assertEqual(self.cache.version(scope), version + 1)
+
+    def test_local_entries_expire_without_shared_versions(self):
+        """Test that local-only caches get a short TTL since other processes can't invalidate them"""
+        self.assertEqual(self.cache.local.ttl, 30)
+
+    def test_rollback_does_not_invalidate(self):
+        """Test that flushed but rolled back writes leave versions unchanged"""
+        scope = ('user', 'u1')
+        version = self.cache.version(scope)
+
+        self.feedback_request.topic = 'Changed'
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertEqual(self.cache.version(scope), version)
+
+    def test_disabled_cache_always_renders(self):
+        self.cache.enabled = False
+        render = MagicMock(return_value="x")
+        self.cache.get_or_render('list', ('user', 'u1'), render)
+        self.cache.get_or_render('list', ('user', 'u1'), render)
+        self.assertEqual(render.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from urllib.parse import urlsplit
+from flask import Flask, jsonify, request
+from flask_login import LoginManager
+
+os.environ.setdefault('LLM_BACKEND', 'fake')
+
+from extensions import db
+from models import FeedbackProvider, FeedbackSession, IdempotencyKey, User
+from idempotency import idempotent, purge_expired_keys
+from routes import main
+
+class TestIdempotency(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'app.db')
+        self.app.config['IDEMPOTENCY_POLL_INTERVAL'] = 0.01
+        self.app.config['IDEMPOTENCY_WAIT_SECONDS'] = 5
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: None)
+
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.status = 200
+
+        @self.app.route('/create', methods=['POST'])
+        @idempotent
+        def create():
+            self.calls += 1
+            self.release.wait(5)
+            return jsonify(call=self.calls, payload=request.get_json()), self.status
+
+        with self.app.app_context():
+            db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+
+    def post(self, key='key-1', payload=None, client=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        return (client or self.client).post('/create', json=payload or {'topic': 'a'}, headers=headers)
+
+    def test_retry_replays_stored_response(self):
+        """Test that a repeated key returns the first response without rerunning the view"""
+        first = self.post()
+        second = self.post()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json, first.json)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+
+    def test_without_header_runs_every_time(self):
+        self.post(key=None)
+        self.post(key=None)
+        self.assertEqual(self.calls, 2)
+
+    def test_key_reuse_with_different_body_rejected(self):
+        self.post(payload={'topic': 'a'})
+        response = self.post(payload={'topic': 'b'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_client_errors_are_replayed_server_errors_are_not(self):
+        """Test that 4xx responses are stored while 5xx responses release the key"""
+        self.status = 400
+        self.post(key='bad')
+        self.assertEqual(self.post(key='bad').status_code, 400)
+        self.assertEqual(self.calls, 1)
+
+        self.status = 500
+        self.post(key='fail')
+        self.status = 200
+        self.assertEqual(self.post(key='fail').status_code, 200)
+        self.assertEqual(self.calls, 3)
+
+    def test_concurrent_duplicate_waits_for_first(self):
+        """Test that a duplicate arriving mid-flight gets the first response instead of running again"""
+        self.release.clear()
+        results = {}
+        first = threading.Thread(target=lambda: results.setdefault('first', self.post(client=self.app.test_client())))
+        first.start()
+        while self.calls == 0:
+            threading.Event().wait(0.01)
+
+        second = threading.Thread(target=lambda: results.setdefault('second', self.post(client=self.app.test_client())))
+        second.start()
+        threading.Event().wait(0.1)
+        self.release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results['second'].json, results['first'].json)
+        self.assertEqual(results['second'].headers['Idempotent-Replayed'], 'true')
+
+    def test_expired_key_runs_again_and_is_purged(self):
+        self.post()
+        with self.app.app_context():
+            IdempotencyKey.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+        self.post()
+        self.assertEqual(self.calls, 2)
+
+        with self.app.app_context():
+            IdempotencyKey.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+            self.assertEqual(purge_expired_keys(), 1)
+            self.assertEqual(IdempotencyKey.query.count(), 0)
+
+class TestFeedbackSubmission(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmpdir.name, 'app.db')
+        self.app.config['SECRET_KEY'] = 'test'
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: db.session.get(User, user_id))
+        self.app.register_blueprint(main)
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(User(id_string='u1', username='owner', email='owner@example.com'))
+            db.session.commit()
+
+        patcher = patch('routes.send_feedback_request_email')
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+
+    def invite(self):
+        """Request feedback as the requestor and return the emailed link's path and query"""
+        requestor = self.app.test_client()
+        with requestor.session_transaction() as session:
+            session['_user_id'] = 'u1'
+        response = requestor.post('/request_feedback', json={'topic': 'Planning', 'recipient_email': 'p@example.com'},
+                                  headers={'Idempotency-Key': 'invite-1'})
+        self.assertEqual(response.status_code, 200)
+        url = urlsplit(self.send.call_args.kwargs['feedback_url'])
+        return url.path, url.query
+
+    def submit(self, path, query, key='submit-1'):
+        # Mirrors feedback.js: request id from the path, token carried over from the page URL
+        request_id = path.split('/')[-1]
+        url = f'/feedback/submit/{request_id}' + (f'?{query}' if query else '')
+        return self.app.test_client().post(url, json={'feedback': 'What went well?\nGreat planning'},
+                                           headers={'Idempotency-Key': key})
+
+    def test_invited_provider_submission_completes_provider(self):
+        """Test the real flow: the invitation link's token identifies the provider on submit"""
+        path, query = self.invite()
+        self.assertIn('token=', query)
+
+        response = self.submit(path, query)
+        self.assertEqual(response.status_code, 200, response.json)
+        with self.app.app_context():
+            provider = FeedbackProvider.query.one()
+            self.assertEqual(provider.status, 'completed')
+            session = FeedbackSession.query.one()
+            self.assertEqual(session.feedback_provider_id, provider.id)
+            self.assertIn('analysis', session.content)
+
+        self.assertEqual(self.submit(path, query, key='submit-2').status_code, 409)
+
+    def test_submission_without_invitation_rejected(self):
+        path, _ = self.invite()
+        self.assertEqual(self.submit(path, '').status_code, 403)
+        self.assertEqual(self.submit(path, 'token=guess').status_code, 403)
+        with self.app.app_context():
+            self.assertEqual(FeedbackSession.query.count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from llm_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMUnavailableError,
+    LatencyWindow,
+    ResilientChatClient,
+)
+
+def make_client(side_effect):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = side_effect
+    return client
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the breaker"""
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_half_open_single_probe(self):
+        """Test that only one probe is allowed after the cool-down"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 11
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed half-open probe re-opens the breaker"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 11
+        self.breaker.allow_request()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+class TestResilientChatClient(unittest.TestCase):
+    def setUp(self):
+        sleep_patcher = patch('llm_resilience.time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def test_retries_then_succeeds(self):
+        """Test that retryable errors are retried with a per-call timeout"""
+        client = make_client([TimeoutError(), TimeoutError(), "ok"])
+        resilient = ResilientChatClient(client, timeout=5, max_retries=2)
+
+        self.assertEqual(resilient.create(model="m", messages=[]), "ok")
+        self.assertEqual(client.chat.completions.create.call_count, 3)
+        self.assertEqual(client.chat.completions.create.call_args.kwargs["timeout"], 5)
+        self.assertEqual(resilient.get_state()["counters"]["retries"], 2)
+
+    def test_non_retryable_error_raises(self):
+        """Test that non-retryable errors are raised immediately"""
+        client = make_client(ValueError("bad request"))
+        resilient = ResilientChatClient(client, max_retries=2)
+
+        with self.assertRaises(ValueError):
+            resilient.create(model="m", messages=[])
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+
+    def test_non_retryable_error_during_probe_releases_it(self):
+        """Test that a non-retryable error in the half-open probe doesn't lock the breaker"""
+        clock = FakeClock()
+        client = make_client([TimeoutError(), ValueError("bad request"), "ok"])
+        resilient = ResilientChatClient(client, max_retries=0,
+                                        breaker=CircuitBreaker(failure_threshold=1, recovery_timeout=10, clock=clock))
+
+        with self.assertRaises(LLMUnavailableError):
+            resilient.create(model="m", messages=[])
+        clock.now = 11
+        with self.assertRaises(ValueError):
+            resilient.create(model="m", messages=[{"role": "user", "content": "probe"}])
+        self.assertEqual(resilient.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.assertEqual(resilient.create(model="m", messages=[]), "ok")
+        self.assertEqual(resilient.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_breaker_fails_fast(self):
+        """Test that an open breaker short-circuits without calling the API"""
+        client = make_client(TimeoutError())
+        resilient = ResilientChatClient(client, max_retries=0,
+                                        breaker=CircuitBreaker(failure_threshold=1, recovery_timeout=60))
+
+        with self.assertRaises(LLMUnavailableError):
+            resilient.create(model="m", messages=[])
+        with self.assertRaises(CircuitOpenError):
+            resilient.create(model="m", messages=[])
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(resilient.get_state()["circuit"]["state"], "open")
+
+    def test_serves_cached_response_when_open(self):
+        """Test that a previously successful identical call is served from cache"""
+        client = make_client(["cached", TimeoutError()])
+        resilient = ResilientChatClient(client, max_retries=0,
+                                        breaker=CircuitBreaker(failure_threshold=1, recovery_timeout=60))
+        messages = [{"role": "user", "content": "hi"}]
+
+        resilient.create(model="m", messages=messages)
+        self.assertEqual(resilient.create(model="m", messages=messages), "cached")
+        self.assertEqual(resilient.create(model="m", messages=messages), "cached")
+        self.assertEqual(resilient.get_state()["counters"]["cache_hits"], 2)
+
+    def test_cached_fallback_matches_request_options(self):
+        """Test that a cached response isn't served for a call with a different response_format"""
+        client = make_client(["free text", TimeoutError(), TimeoutError()])
+        resilient = ResilientChatClient(client, max_retries=0,
+                                        breaker=CircuitBreaker(failure_threshold=5, recovery_timeout=60))
+        resilient.create(model="m", messages=[])
+
+        with self.assertRaises(LLMUnavailableError):
+            resilient.create(model="m", messages=[], response_format={"type": "json_object"})
+        self.assertEqual(resilient.create(model="m", messages=[]), "free text")
+
+    def test_hedged_request_wins(self):
+        """Test that a slow primary call is raced by a hedged request"""
+        release = threading.Event()
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                release.wait(2)
+                return "slow"
+            return "fast"
+
+        client = MagicMock()
+        client.chat.completions.create.side_effect = create
+        resilient = ResilientChatClient(client, timeout=5, hedge=True, hedge_min_samples=1)
+        resilient._latency_for("m").record(0.01)
+
+        self.assertEqual(resilient.create(model="m", messages=[]), "fast")
+        release.set()
+        self.assertEqual(resilient.get_state()["counters"]["hedge_wins"], 1)
+
+class TestLatencyWindow(unittest.TestCase):
+    def test_percentiles(self):
+        window = LatencyWindow(size=100)
+        for i in range(1, 101):
+            window.record(i / 1000)
+        self.assertAlmostEqual(window.percentile(95), 0.095, places=3)
+        self.assertIsNone(LatencyWindow().percentile(95))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import MagicMock
+from model_routing import ROUTING_TABLE, ModelRouter, TaskRoute
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.router = ModelRouter(
+            routing_table={
+                "analysis": TaskRoute(tiers=("quality", "fast"), slo_ms=1000),
+                "summary": TaskRoute(tiers=("fast",), slo_ms=500),
+            },
+            tiers={"quality": "big-model", "fast": "small-model"},
+            min_samples=5,
+            window_seconds=60,
+            clock=self.clock,
+        )
+
+    def test_prefers_first_tier(self):
+        """Test that the preferred tier is used without latency data"""
+        self.assertEqual(self.router.select("analysis"), "big-model")
+        self.assertEqual(self.router.select("summary"), "small-model")
+
+    def test_falls_back_when_p95_breaches_slo(self):
+        """Test fallback to the faster tier once p95 exceeds the SLO"""
+        for _ in range(5):
+            self.router.record("analysis", "big-model", 2.0)
+        self.assertEqual(self.router.select("analysis"), "small-model")
+
+    def test_needs_minimum_samples(self):
+        """Test that a few slow calls do not trigger fallback"""
+        for _ in range(4):
+            self.router.record("analysis", "big-model", 2.0)
+        self.assertEqual(self.router.select("analysis"), "big-model")
+
+    def test_recovers_after_window(self):
+        """Test that the preferred tier is retried once slow samples expire"""
+        for _ in range(5):
+            self.router.record("analysis", "big-model", 2.0)
+        self.clock.now = 61
+        self.assertEqual(self.router.select("analysis"), "big-model")
+
+    def test_records_token_usage(self):
+        """Test per-task token accounting"""
+        usage = MagicMock(prompt_tokens=100, completion_tokens=20)
+        self.router.record("summary", "small-model", 0.2, usage=usage)
+        self.router.record("summary", "small-model", 0.3, error=True)
+
+        stats = self.router.get_stats()["summary"]["models"]["small-model"]
+        self.assertEqual(stats["calls"], 2)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["prompt_tokens"], 100)
+        self.assertEqual(stats["completion_tokens"], 20)
+
+    def test_latency_sensitive_tasks_use_fast_tier(self):
+        """Test that simple tasks on the request path never wait on a slower tier"""
+        for task in ("initiate_conversation", "summarize_conversation", "json_repair", "feedback_prompts"):
+            self.assertEqual(ROUTING_TABLE[task].tiers, ("fast",))
+
+    def test_unknown_task(self):
+        with self.assertRaises(ValueError):
+            self.router.select("unknown")
+
+if __name__ == '__main__':
+    unittest.main()
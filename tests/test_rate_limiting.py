@@ -0,0 +1,160 @@
+import os
+import unittest
+from unittest.mock import MagicMock
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+from extensions import db
+from models import FeedbackProvider
+from auth_utils import verify_feedback_token
+from rate_limiting import RateLimiter, SlidingWindowCounter, parse_limit, rate_limit
+
+os.environ.setdefault('LLM_BACKEND', 'fake')
+
+from routes import main
+
+class TestSlidingWindowCounter(unittest.TestCase):
+    def test_previous_window_decays(self):
+        """Test that hits from the previous window count in proportion to their overlap"""
+        now = [0.0]
+        counter = SlidingWindowCounter(clock=lambda: now[0])
+        for _ in range(10):
+            counter.hit('k', 60)
+
+        now[0] = 75.0  # A quarter into the next window: 3/4 of the old hits still overlap
+        self.assertEqual(counter.hit('k', 60), 1 + 10 * 0.75)
+        now[0] = 200.0  # Two windows later nothing carries over
+        self.assertEqual(counter.hit('k', 60), 1)
+
+    def test_bounded_number_of_keys(self):
+        counter = SlidingWindowCounter(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            counter.hit(key, 60)
+        self.assertEqual(list(counter._data), ['b', 'c'])
+
+    def test_parse_limit(self):
+        self.assertEqual(parse_limit('60/minute'), (60, 60))
+        self.assertEqual(parse_limit('5/seconds'), (5, 1))
+        with self.assertRaises(ValueError):
+            parse_limit('5/fortnight')
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['RATE_LIMITS'] = {
+            'feedback_session': '3/minute',
+            'feedback_token_ip': '100/minute',
+            'feedback_token_prefix': '2/minute',
+        }
+        self.app.config['RATE_LIMIT_EXEMPT_IPS'] = ['10.0.0.0/8']
+        db.init_app(self.app)
+        self.limiter = RateLimiter()
+        self.limiter.init_app(self.app)
+
+        self.view = MagicMock(return_value='ok')
+
+        @self.app.route('/feedback_session/<request_id>')
+        @rate_limit('feedback_session')
+        def feedback_session(request_id):
+            return self.view(request_id)
+
+        @self.app.route('/verify/<token>')
+        def verify(token):
+            return 'valid' if verify_feedback_token(token) else 'invalid'
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.queries = []
+        event.listen(db.engine, 'before_cursor_execute', self.record_query)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self.record_query)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def record_query(self, *args):
+        self.queries.append(args[2])
+
+    def get(self, path, ip='203.0.113.5', **kwargs):
+        return self.client.get(path, environ_base={'REMOTE_ADDR': ip}, **kwargs)
+
+    def test_rejects_before_view_runs(self):
+        """Test that requests over the per-IP limit get 429 without reaching the view"""
+        statuses = [self.get('/feedback_session/r1').status_code for _ in range(5)]
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+        self.assertEqual(self.view.call_count, 3)
+        self.assertIn('Retry-After', self.get('/feedback_session/r1').headers)
+        self.assertEqual(self.limiter.get_stats()['rejected']['feedback_session'], 3)
+
+    def test_limits_are_per_ip(self):
+        for _ in range(3):
+            self.get('/feedback_session/r1')
+        self.assertEqual(self.get('/feedback_session/r1', ip='198.51.100.7').status_code, 200)
+
+    def test_exempt_network(self):
+        statuses = {self.get('/feedback_session/r1', ip='10.1.2.3').status_code for _ in range(10)}
+        self.assertEqual(statuses, {200})
+
+    def test_forwarded_for_with_trusted_proxy(self):
+        """Test that the client address comes from the hop the trusted proxy appended"""
+        self.limiter.proxy_hops = 1
+        for i in range(3):
+            self.get('/feedback_session/r1', headers={'X-Forwarded-For': f'1.1.1.{i}, 203.0.113.9'})
+        response = self.get('/feedback_session/r1', headers={'X-Forwarded-For': '8.8.8.8, 203.0.113.9'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.get('/feedback_session/r1', headers={'X-Forwarded-For': '203.0.113.10'}).status_code, 200)
+
+    def test_warns_when_proxy_headers_ignored(self):
+        with self.assertLogs('rate_limiting', level='WARNING') as logs:
+            self.get('/feedback_session/r1', headers={'X-Forwarded-For': '8.8.8.8'})
+            self.get('/feedback_session/r1', headers={'X-Forwarded-For': '8.8.8.8'})
+        self.assertEqual(len([line for line in logs.output if 'RATE_LIMIT_PROXY_HOPS' in line]), 1)
+
+    def test_token_guessing_rejected_without_db_access(self):
+        """Test that a throttled token check never queries the provider table"""
+        self.assertEqual(self.get('/verify/abcdefgh-1').data, b'invalid')
+        self.assertEqual(self.get('/verify/abcdefgh-2').data, b'invalid')
+        self.queries.clear()
+
+        response = self.get('/verify/abcdefgh-3', ip='198.51.100.7')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.queries, [])
+
+    def test_valid_token_under_limit(self):
+        db.session.add(FeedbackProvider(provider_email='p@example.com', access_token='tok-valid'))
+        db.session.commit()
+        self.assertEqual(self.get('/verify/tok-valid').data, b'valid')
+
+    def test_disabled(self):
+        self.limiter.enabled = False
+        statuses = {self.get('/feedback_session/r1').status_code for _ in range(5)}
+        self.assertEqual(statuses, {200})
+
+class TestChatMessageLimit(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SECRET_KEY'] = 'test'
+        self.app.config['RATE_LIMITS'] = {'chat_message': '2/minute'}
+        self.app.config['RATE_LIMIT_PROXY_HOPS'] = 1
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: None)
+        RateLimiter().init_app(self.app)
+        self.app.register_blueprint(main)
+        self.client = self.app.test_client()
+
+    def post(self, forwarded_for):
+        return self.client.post('/chat/message', json={}, headers={'X-Forwarded-For': forwarded_for})
+
+    def test_chat_messages_limited_per_forwarded_client(self):
+        """Test that the LLM-backed chat route is limited per client behind the router"""
+        statuses = [self.post('203.0.113.5').status_code for _ in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertEqual(self.post('198.51.100.7').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
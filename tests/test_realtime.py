@@ -0,0 +1,110 @@
+import unittest
+from datetime import datetime
+from flask import Flask
+from flask_login import LoginManager
+from extensions import db, socketio
+from models import FeedbackProvider, FeedbackRequest, FeedbackSession, User
+import realtime
+
+class TestRealtime(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SECRET_KEY'] = 'test'
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: db.session.get(User, user_id))
+        socketio.init_app(self.app)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([User(id_string='u1', username='owner', email='owner@example.com'),
+                            User(id_string='u2', username='other', email='other@example.com')])
+        self.feedback_request = FeedbackRequest(request_id='r1', topic='Topic', requestor_id='u1')
+        db.session.add(self.feedback_request)
+        db.session.flush()
+        self.provider = FeedbackProvider(feedback_request_id=self.feedback_request.id,
+                                         provider_email='provider@example.com')
+        db.session.add(self.provider)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def connect(self, user_id=None):
+        http_client = self.app.test_client()
+        if user_id:
+            with http_client.session_transaction() as session:
+                session['_user_id'] = user_id
+        # A fresh app context per socket call, as on a server; Flask-Login caches the user on g
+        with self.app.app_context():
+            client = socketio.test_client(self.app, flask_test_client=http_client)
+        self.addCleanup(lambda: client.is_connected() and client.disconnect())
+        return client
+
+    def subscribe(self, client, request_id='r1'):
+        with self.app.app_context():
+            client.emit('subscribe', {'request_id': request_id})
+        return client.get_received()
+
+    def test_rejects_anonymous_connection(self):
+        self.assertFalse(self.connect().is_connected())
+        self.assertTrue(self.connect('u1').is_connected())
+
+    def test_only_requestor_can_subscribe(self):
+        """Test that another user can't join a request's room"""
+        received = self.subscribe(self.connect('u2'))
+        self.assertEqual([message['name'] for message in received], ['subscription_error'])
+
+        received = self.subscribe(self.connect('u1'))
+        self.assertEqual([message['name'] for message in received], ['subscribed'])
+
+    def test_events_sent_after_commit(self):
+        """Test that status changes are only pushed once the transaction commits"""
+        owner = self.connect('u1')
+        other = self.connect('u2')
+        self.subscribe(owner)
+        self.subscribe(other)
+
+        self.provider.status = 'completed'
+        db.session.add(FeedbackSession(feedback_request_id=self.feedback_request.id,
+                                       feedback_provider_id=self.provider.id,
+                                       content={'feedback': 'Great', 'analysis': {'themes': []}},
+                                       completed_at=datetime.utcnow()))
+        db.session.flush()
+        self.assertEqual(owner.get_received(), [])
+
+        db.session.commit()
+        received = owner.get_received()
+        self.assertEqual(sorted(message['name'] for message in received), ['analysis_ready', 'provider_status'])
+        status = next(message for message in received if message['name'] == 'provider_status')
+        self.assertEqual(status['args'][0], {'provider_id': self.provider.id, 'status': 'completed'})
+        self.assertEqual(other.get_received(), [])
+
+    def test_rollback_discards_events(self):
+        owner = self.connect('u1')
+        self.subscribe(owner)
+
+        self.provider.status = 'completed'
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+
+        self.assertEqual(owner.get_received(), [])
+        self.assertNotIn(realtime._PENDING_KEY, db.session.info)
+
+    def test_request_status_goes_to_user_room(self):
+        owner = self.connect('u1')
+        owner.get_received()
+
+        self.feedback_request.status = 'completed'
+        db.session.commit()
+
+        received = owner.get_received()
+        self.assertEqual([message['name'] for message in received], ['request_status'])
+        self.assertEqual(received[0]['args'][0], {'request_id': 'r1', 'status': 'completed'})
+
+if __name__ == '__main__':
+    unittest.main()
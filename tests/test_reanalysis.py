@@ -0,0 +1,151 @@
+import os
+os.environ.setdefault('LLM_BACKEND', 'fake')
+
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from extensions import db
+from models import BackfillCheckpoint, FeedbackRequest, FeedbackSession, User
+from archival import archive_sessions
+from chat_service import analyze_feedback, openai_client
+from fake_llm import FakeOpenAI
+from fragment_cache import FragmentCache
+from reanalysis import RateLimiter, reanalyze_command, reanalyze_sessions
+
+class TestReanalysis(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.app.cli.add_command(reanalyze_command)
+
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(User(id_string='u1', username='user', email='user@example.com'))
+        feedback_request = FeedbackRequest(request_id='r1', topic='Topic', requestor_id='u1')
+        db.session.add(feedback_request)
+        db.session.flush()
+        old = datetime.utcnow() - timedelta(days=365)
+        for i in range(7):
+            db.session.add(FeedbackSession(feedback_request_id=feedback_request.id, completed_at=old,
+                                           content={'feedback': f'Great planning and delivery {i}',
+                                                    'analysis': {'summary': 'old'}}))
+        # Incomplete and empty sessions are never analyzed
+        db.session.add(FeedbackSession(feedback_request_id=feedback_request.id, content={'feedback': 'draft'}))
+        db.session.add(FeedbackSession(feedback_request_id=feedback_request.id, completed_at=old, content={}))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def analyses(self):
+        db.session.expire_all()
+        return {s.id: s.content.get('analysis') for s in FeedbackSession.query.order_by(FeedbackSession.id)}
+
+    def test_uses_fake_backend(self):
+        self.assertIsInstance(openai_client, FakeOpenAI)
+
+    def test_reanalyzes_completed_sessions(self):
+        """Test that every completed session with feedback gets a new tagged analysis"""
+        stats = reanalyze_sessions('v2', analyze_feedback, workers=3, rate=1000, batch_size=3)
+
+        self.assertEqual(stats['status'], 'completed')
+        self.assertEqual(stats['analyzed'], 7)
+        self.assertEqual(stats['skipped'], 1)
+        analyses = self.analyses()
+        summaries = {analyses[session_id]['summary'] for session_id in range(1, 8)}
+        self.assertEqual(len(summaries), 7)
+        self.assertTrue(all(summary.startswith('Fake analysis') for summary in summaries))
+        self.assertEqual(analyses[8], None)
+        self.assertEqual(db.session.get(FeedbackSession, 1).content['analysis_version'], 'v2')
+
+    def test_resumes_and_skips_done_sessions(self):
+        """Test that a bounded run checkpoints and a restart doesn't redo finished sessions"""
+        analyze = MagicMock(side_effect=analyze_feedback)
+        stats = reanalyze_sessions('v2', analyze, rate=1000, batch_size=2, limit=4)
+        self.assertEqual(stats['status'], 'running')
+        self.assertEqual(db.session.get(BackfillCheckpoint, 'reanalyze:v2').last_id, 4)
+
+        reanalyze_sessions('v2', analyze, rate=1000, batch_size=2)
+        self.assertEqual(analyze.call_count, 7)
+
+        stats = reanalyze_sessions('v2', analyze, rate=1000, restart=True)
+        self.assertEqual(analyze.call_count, 7)
+        self.assertEqual(stats['skipped'], 8)
+
+    def test_failures_leave_sessions_unchanged(self):
+        def flaky(feedback):
+            if feedback.endswith('3'):
+                raise RuntimeError("LLM down")
+            return analyze_feedback(feedback)
+
+        stats = reanalyze_sessions('v2', flaky, rate=1000)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(self.analyses()[4], {'summary': 'old'})
+
+    def test_rerun_retries_failed_sessions(self):
+        """Test that failures keep the run open and a plain rerun retries only them"""
+        outage = {'down': True}
+
+        def flaky(feedback):
+            if outage['down'] and feedback.endswith(('3', '5')):
+                raise RuntimeError("LLM down")
+            return analyze_feedback(feedback)
+
+        analyze = MagicMock(side_effect=flaky)
+        stats = reanalyze_sessions('v2', analyze, rate=1000, batch_size=2)
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['status'], 'running')
+        self.assertEqual(db.session.get(BackfillCheckpoint, 'reanalyze:v2').last_id, 3)
+
+        outage['down'] = False
+        analyze.reset_mock()
+        stats = reanalyze_sessions('v2', analyze, rate=1000, batch_size=2)
+        self.assertEqual(stats['status'], 'completed')
+        self.assertEqual(analyze.call_count, 2)
+        self.assertEqual(self.analyses()[4]['summary'][:13], 'Fake analysis')
+
+    def test_archived_sessions_stay_archived(self):
+        cache = FragmentCache()
+        cache.init_app(self.app)
+        archive_sessions(older_than_days=180)
+        scope = ('request', db.session.get(FeedbackSession, 1).feedback_request_id)
+        version = cache.version(scope)
+
+        with patch('realtime.socketio') as socketio:
+            reanalyze_sessions('v2', analyze_feedback, rate=1000)
+
+        db.session.expire_all()
+        session = db.session.get(FeedbackSession, 1)
+        self.assertIsNotNone(session.archived_at)
+        self.assertEqual(session.content['analysis_version'], 'v2')
+        # The dashboard must drop cached fragments and hear about the new analysis
+        self.assertGreater(cache.version(scope), version)
+        events = [call.args[0] for call in socketio.emit.call_args_list]
+        self.assertEqual(events.count('analysis_ready'), 7)
+
+    def test_cli_reports_progress(self):
+        result = self.app.test_cli_runner().invoke(args=['reanalyze', '--tag', 'v2', '--rate', '1000'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Re-analysis v2 completed: 7 analyzed', result.output)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_waits_when_bucket_is_empty(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(rate=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(sleeps, [0.5, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
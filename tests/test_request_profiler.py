@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from flask import Flask
+from flask_login import LoginManager
+from extensions import db
+from models import User
+from request_profiler import StackSampler, init_profiler, to_speedscope
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+class TestRequestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        templates = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+        self.app = Flask(__name__, template_folder=templates)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['PROFILER_DIR'] = self.tmpdir.name
+        self.app.config['PROFILER_TOKEN'] = 'secret'
+        self.app.config['SECRET_KEY'] = 'test'
+        db.init_app(self.app)
+        LoginManager(self.app).user_loader(lambda user_id: db.session.get(User, user_id))
+        init_profiler(self.app)
+
+        @self.app.route('/slow')
+        def slow():
+            User.query.filter_by(email='nobody@example.com').first()
+            busy_wait(0.05)
+            return 'ok'
+
+        # base.html links to these
+        self.app.add_url_rule('/', 'main.index', lambda: '')
+        self.app.add_url_rule('/dashboard', 'main.dashboard', lambda: '')
+        self.app.add_url_rule('/logout', 'google_auth.logout', lambda: '')
+        self.app.add_url_rule('/login', 'google_auth.login', lambda: '')
+
+        with self.app.app_context():
+            db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def profiled(self, **headers):
+        return self.client.get('/slow', headers={'X-Profile': '1', 'X-Profile-Token': 'secret', **headers})
+
+    def test_header_from_admin_writes_speedscope_profile(self):
+        """Test that a profiled request saves a sampled profile with its SQL"""
+        response = self.profiled()
+        profile_id = response.headers['X-Profile-Id']
+
+        with open(os.path.join(self.tmpdir.name, f'{profile_id}.speedscope.json')) as f:
+            profile = json.load(f)
+        sampled, sql = profile['profiles']
+        self.assertEqual(sampled['type'], 'sampled')
+        self.assertGreater(len(sampled['samples']), 5)
+        frame_names = {frame['name'] for frame in profile['shared']['frames']}
+        self.assertIn('busy_wait', frame_names)
+        self.assertEqual(len(sql['events']), 2)
+
+        with open(os.path.join(self.tmpdir.name, f'{profile_id}.meta.json')) as f:
+            meta = json.load(f)
+        self.assertEqual(meta['query_count'], 1)
+        self.assertIn('FROM user', meta['queries'][0]['statement'])
+
+    def test_header_without_admin_is_ignored(self):
+        response = self.client.get('/slow', headers={'X-Profile': '1', 'X-Profile-Token': 'wrong'})
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_sample_rate_covers_signed_in_users_only(self):
+        """Test that sampling never profiles anonymous traffic such as feedback providers"""
+        self.app.config['PROFILER_SAMPLE_RATE'] = 1.0
+        self.assertNotIn('X-Profile-Id', self.client.get('/slow').headers)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+        with self.app.app_context():
+            db.session.add(User(id_string='u1', username='user', email='user@example.com'))
+            db.session.commit()
+        with self.client.session_transaction() as session:
+            session['_user_id'] = 'u1'
+        self.assertIn('X-Profile-Id', self.client.get('/slow').headers)
+
+    def test_keeps_most_recent_profiles(self):
+        self.app.config['PROFILER_MAX_PROFILES'] = 2
+        for _ in range(3):
+            self.profiled()
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 4)
+
+    def test_index_lists_profiles_for_admins_only(self):
+        self.profiled()
+        self.assertEqual(self.client.get('/_profiles/').status_code, 404)
+        response = self.client.get('/_profiles/', headers={'X-Profile-Token': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'GET /slow', response.data)
+
+class TestSpeedscopeExport(unittest.TestCase):
+    def test_weights_follow_sample_timestamps(self):
+        sampler = StackSampler(thread_id=0)
+        sampler.started, sampler.stopped = 10.0, 10.004
+        frame = ('view', 'app.py', 1)
+        sampler.samples = [(10.001, (frame,)), (10.003, (frame, ('query', 'db.py', 5))), (10.005, (frame,))]
+        profile = to_speedscope('GET /', sampler, [{'statement': 'SELECT 1', 'start_ms': 1.0, 'duration_ms': 0.5}])
+
+        sampled, sql = profile['profiles']
+        self.assertEqual(sampled['samples'], [[0], [0, 1]])
+        self.assertEqual(sampled['weights'], [1.0, 2.0])
+        self.assertEqual(sql['events'], [{'type': 'O', 'frame': 2, 'at': 1.0}, {'type': 'C', 'frame': 2, 'at': 1.5}])
+
+if __name__ == '__main__':
+    unittest.main()
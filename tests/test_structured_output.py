@@ -0,0 +1,75 @@
+import unittest
+from structured_output import (
+    StructuredOutputError,
+    parse_structured_output,
+    repair_json,
+    response_format_kwargs,
+)
+
+class TestRepairJson(unittest.TestCase):
+    def test_plain_json(self):
+        """Test that valid JSON parses unchanged"""
+        self.assertEqual(repair_json('{"summary": "ok"}'), {"summary": "ok"})
+
+    def test_code_fence_and_prose(self):
+        """Test extraction from fenced output surrounded by prose"""
+        text = 'Here you go:\n```json\n{"summary": "fenced"}\n```\nLet me know!'
+        self.assertEqual(repair_json(text), {"summary": "fenced"})
+
+    def test_trailing_text_and_commas(self):
+        """Test that trailing text and trailing commas are tolerated"""
+        text = '{"themes": ["a", "b",], "summary": "x",} I hope this helps {really}'
+        self.assertEqual(repair_json(text), {"themes": ["a", "b"], "summary": "x"})
+
+    def test_braces_inside_strings(self):
+        """Test that braces inside string values do not end the object early"""
+        self.assertEqual(repair_json('{"summary": "use {braces} \\" here"} trailing'),
+                         {"summary": 'use {braces} " here'})
+
+    def test_truncated_output(self):
+        """Test that output cut off mid-object is closed"""
+        self.assertEqual(repair_json('{"themes": ["a", "b'), {"themes": ["a", "b"]})
+
+    def test_unrepairable_output(self):
+        """Test that output without any JSON raises"""
+        with self.assertRaises(StructuredOutputError):
+            repair_json("Sorry, I cannot help with that.")
+
+class TestParseStructuredOutput(unittest.TestCase):
+    def test_valid_analysis(self):
+        """Test validation passes and unknown keys are dropped"""
+        text = '{"themes": ["t"], "action_items": [], "summary": "s", "extra": 1}'
+        self.assertEqual(parse_structured_output(text, "feedback_analysis"),
+                         {"themes": ["t"], "action_items": [], "summary": "s"})
+
+    def test_missing_required_key(self):
+        """Test that a missing key fails validation"""
+        with self.assertRaises(StructuredOutputError) as ctx:
+            parse_structured_output('{"introduction": "i", "questions": ["q"]}', "feedback_prompts")
+        self.assertIn("closing", str(ctx.exception))
+
+    def test_wrong_item_type(self):
+        """Test that nested type errors fail validation"""
+        with self.assertRaises(StructuredOutputError):
+            parse_structured_output('{"introduction": "i", "questions": [1], "closing": "c"}', "feedback_prompts")
+
+    def test_empty_required_list(self):
+        """Test that minItems is enforced"""
+        with self.assertRaises(StructuredOutputError):
+            parse_structured_output('{"themes": [], "action_items": [], "summary": "s"}', "feedback_analysis")
+
+class TestResponseFormat(unittest.TestCase):
+    def test_schema_capable_model(self):
+        kwargs = response_format_kwargs("gpt-4o-mini", "chat_response")
+        self.assertEqual(kwargs["response_format"]["type"], "json_schema")
+        self.assertTrue(kwargs["response_format"]["json_schema"]["strict"])
+
+    def test_json_mode_model(self):
+        self.assertEqual(response_format_kwargs("gpt-4-turbo", "chat_response"),
+                         {"response_format": {"type": "json_object"}})
+
+    def test_legacy_model(self):
+        self.assertEqual(response_format_kwargs("gpt-4", "chat_response"), {})
+
+if __name__ == '__main__':
+    unittest.main()